@@ -0,0 +1,190 @@
+"""
+Alertes clients: rapprochement ensembliste des scores du jour avec les seuils
+(client.alert_threshold) et les abonnements sectoriels (préfixes NAF de
+client_sector, plus les codes NAF cités dans client.sector_focus).
+
+- match_alerts(): une requête pour tous les clients. Les scores de la fenêtre
+  (idx_score_daily_date) sont joints aux abonnements par égalité sur les
+  préfixes du code NAF de la société (hash join), jamais par une boucle
+  clients x sociétés. Upsert idempotent dans client_alert: relancer
+  le job ne crée rien; un score qui monte réarme la notification.
+- notify_pending(): une notification par client regroupant ses alertes en
+  attente (e-mail si ALERT_SMTP_HOST est défini, sinon journal).
+
+Un client sans abonnement sectoriel reçoit les alertes de tous les secteurs.
+"""
+import datetime
+import os
+import smtplib
+from email.message import EmailMessage
+
+from app.db import connection
+
+# Jours re-balayés avant la date du jour (scores corrigés par recompute-dirty)
+ALERT_LOOKBACK_DAYS = int(os.getenv("ALERT_LOOKBACK_DAYS", "2"))
+ALERT_DIGEST_MAX_ITEMS = int(os.getenv("ALERT_DIGEST_MAX_ITEMS", "50"))
+ALERT_SMTP_HOST = os.getenv("ALERT_SMTP_HOST", "")
+ALERT_SMTP_PORT = int(os.getenv("ALERT_SMTP_PORT", "25"))
+ALERT_SMTP_FROM = os.getenv("ALERT_SMTP_FROM", "radar@localhost")
+
+_MATCH_SQL = """
+    with subs as (
+      -- abonnements: préfixes NAF normalisés (sans point, majuscules)
+      select client_id, upper(replace(naf_prefix, '.', '')) as prefix
+        from client_sector
+      union
+      select c.id, upper(replace(btrim(t.tok), '.', ''))
+        from client c, regexp_split_to_table(coalesce(c.sector_focus, ''), '[;,]') as t(tok)
+       where btrim(t.tok) ~ '^[0-9]{2}[0-9.]*[A-Za-z]?$'
+    ),
+    clients as (
+      select c.id, c.alert_threshold, exists (select 1 from subs s where s.client_id = c.id) as filtered
+        from client c
+       where c.is_active and c.alert_threshold is not null
+    ),
+    scores as (
+      -- scores de la fenêtre au-dessus du plus bas seuil actif
+      select d.company_id, d.score_date, d.score_total, d.top_signal_type,
+             upper(replace(coalesce(co.naf, ''), '.', '')) as naf
+        from company_score_daily d
+        join company co on co.id = d.company_id
+       where d.score_date between %(d0)s::date and %(d1)s::date
+         and d.score_total >= (select min(alert_threshold) from clients)
+    ),
+    matched as (
+      -- secteur: un préfixe du NAF de la société égal à un abonnement
+      (select distinct on (s.client_id, sc.company_id, sc.score_date)
+             s.client_id, sc.company_id, sc.score_date, sc.score_total, sc.top_signal_type,
+             s.prefix as naf_prefix
+        from scores sc
+        cross join lateral generate_series(1, length(sc.naf)) as k(n)
+        join subs s on s.prefix = left(sc.naf, k.n)
+        join clients cl on cl.id = s.client_id and cl.filtered
+       where sc.score_total >= cl.alert_threshold
+       order by s.client_id, sc.company_id, sc.score_date, length(s.prefix) desc)
+      union all
+      -- clients sans abonnement: tous secteurs
+      select cl.id, sc.company_id, sc.score_date, sc.score_total, sc.top_signal_type, null
+        from scores sc
+        join clients cl on not cl.filtered and sc.score_total >= cl.alert_threshold
+    ),
+    upserted as (
+      insert into client_alert as a
+             (client_id, company_id, score_date, score, top_signal_type, naf_prefix)
+      select client_id, company_id, score_date, score_total, top_signal_type, naf_prefix
+        from matched
+      on conflict (client_id, company_id, score_date) do update
+        set score = excluded.score,
+            top_signal_type = excluded.top_signal_type,
+            naf_prefix = excluded.naf_prefix,
+            updated_at = now(),
+            -- score en hausse: nouvelle notification
+            notified_at = case when excluded.score > a.score then null else a.notified_at end
+      where (a.score, a.top_signal_type, a.naf_prefix)
+            is distinct from (excluded.score, excluded.top_signal_type, excluded.naf_prefix)
+      returning (xmax = 0) as inserted
+    )
+    select (select count(*) from scores),
+           count(*) filter (where inserted),
+           count(*) filter (where not inserted)
+      from upserted;
+"""
+
+
+def match_alerts(score_date=None, lookback_days: int = ALERT_LOOKBACK_DAYS) -> dict:
+    """
+    Crée / met à jour les alertes de tous les clients actifs pour les scores
+    de [score_date - lookback_days, score_date]. Retourne les compteurs.
+    """
+    d1 = datetime.date.fromisoformat(str(score_date)) if score_date else datetime.date.today()
+    d0 = d1 - datetime.timedelta(days=lookback_days)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_MATCH_SQL, {"d0": d0, "d1": d1})
+            scanned, created, updated = (int(v or 0) for v in cur.fetchone())
+    return {"scores_scanned": scanned, "alerts_created": created, "alerts_updated": updated}
+
+
+def _send(email: str, client_name: str, items: list, total: int) -> None:
+    lines = [f"- {name} (SIREN {siren or 'n/c'}) : score {score} le {d.isoformat()} [{top or 'OTHER'}]"
+             for name, siren, d, score, top in items]
+    if total > len(items):
+        lines.append(f"... et {total - len(items)} autre(s)")
+    body = f"Bonjour,\n\n{total} nouvelle(s) alerte(s) pour {client_name} :\n\n" + "\n".join(lines)
+    if not ALERT_SMTP_HOST:
+        print(f"[alerts] {email}: {total} alerte(s)\n{body}")
+        return
+    msg = EmailMessage()
+    msg["Subject"] = f"Radar FR — {total} alerte(s)"
+    msg["From"] = ALERT_SMTP_FROM
+    msg["To"] = email
+    msg.set_content(body)
+    with smtplib.SMTP(ALERT_SMTP_HOST, ALERT_SMTP_PORT, timeout=30) as smtp:
+        smtp.send_message(msg)
+
+
+def notify_pending(max_items: int = ALERT_DIGEST_MAX_ITEMS) -> dict:
+    """
+    Une notification par client pour ses alertes non notifiées (les max_items
+    plus fortes), marquées notifiées dans la transaction de l'envoi. Les
+    alertes sont verrouillées (skip locked): deux runs ne notifient pas deux fois.
+    """
+    clients = alerts = failed = 0
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                select distinct client_id from client_alert where notified_at is null order by 1;
+            """)
+            pending = [r[0] for r in cur.fetchall()]
+    for client_id in pending:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    with batch as (
+                      select a.id
+                        from client_alert a
+                       where a.client_id = %s and a.notified_at is null
+                         for update skip locked
+                    ),
+                    sent as (
+                      update client_alert a set notified_at = now()
+                        from batch b where a.id = b.id
+                      returning a.id, a.company_id, a.score_date, a.score, a.top_signal_type
+                    )
+                    select c.name, c.email_primary, co.name, co.siren, s.score_date, s.score, s.top_signal_type
+                      from sent s
+                      join client c on c.id = %s
+                      join company co on co.id = s.company_id
+                     order by s.score desc, s.score_date desc;
+                """, (client_id, client_id))
+                rows = cur.fetchall()
+                if not rows:
+                    continue
+                try:
+                    _send(rows[0][1], rows[0][0], [r[2:] for r in rows[:max_items]], len(rows))
+                except (OSError, smtplib.SMTPException) as e:
+                    # rollback: les alertes restent en attente pour le prochain run
+                    conn.rollback()
+                    failed += 1
+                    print(f"[alerts] client {client_id}: envoi impossible ({e})")
+                    continue
+        clients += 1
+        alerts += len(rows)
+    return {"clients_notified": clients, "alerts_notified": alerts, "clients_failed": failed}
+
+
+def run_alerts(score_date=None) -> dict:
+    """Job planifié, juste après recompute-daily: rapprochement puis notifications."""
+    return {**match_alerts(score_date), **notify_pending()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Rapprochement des scores avec les alertes clients")
+    parser.add_argument("--date", default=None)
+    parser.add_argument("--no-notify", action="store_true")
+    args = parser.parse_args()
+    res = match_alerts(args.date) if args.no_notify else run_alerts(args.date)
+    print(json.dumps(res, indent=2))
@@ -1,13 +1,39 @@
-import os, time, psycopg
+import asyncio, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import jwt
 from passlib.context import CryptContext
 
+from app.db import connection, async_connection
+from app.cache import TTLCache
+
 SECRET_KEY = os.getenv("SECRET_KEY", "changeme")
 ALGO = "HS256"
 ACCESS_TOKEN_TTL = 60 * 60 * 24  # 24h
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
-DB_URL = os.getenv("DB_URL", "postgresql://radar:radarpass@db:5432/radar")
+# Caches des requêtes authentifiées: jetons décodés et fiches utilisateur.
+# Les fiches sont invalidées explicitement (invalidate_user, trigger client_user -> NOTIFY).
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+token_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_TOKEN_CACHE_TTL)
+user_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_USER_CACHE_TTL)
+
+# Coût bcrypt configurable: un hash plus faible/ancien est réécrit au login suivant
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt (100-300 ms CPU) tourne dans un pool dédié et borné, isolé du threadpool HTTP
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "32"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_MAX)
+
+# Limitation des tentatives de login (mémoire, par process)
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+LOGIN_EMAIL_WINDOW = int(os.getenv("LOGIN_EMAIL_WINDOW", "900"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_IP_WINDOW = int(os.getenv("LOGIN_IP_WINDOW", "300"))
 
 def hash_password(plain: str) -> str:
     return pwd_ctx.hash(plain)
@@ -15,16 +41,100 @@ def hash_password(plain: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_ctx.verify(plain, hashed)
 
+class PasswordBusy(Exception):
+    """File de vérification bcrypt pleine: le login est refusé plutôt que mis en attente."""
+
+async def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    Vérifie le mot de passe dans le pool bcrypt dédié. Retourne (ok, nouveau_hash);
+    nouveau_hash est non nul si le hash stocké utilise un coût/schéma obsolète.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, pwd_ctx.verify_and_update, plain, hashed)
+    finally:
+        _password_slots.release()
+
+class RateLimiter:
+    """Compteur à fenêtre fixe par clé, borné en nombre de clés (éviction LRU)."""
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._data: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def _current(self, key: str, now: float) -> tuple[float, int]:
+        start, count = self._data.get(key, (now, 0))
+        if now - start >= self.window:
+            start, count = now, 0
+        return start, count
+
+    def retry_after(self, key: str) -> int:
+        """0 si la clé peut tenter, sinon secondes avant la fin de la fenêtre."""
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._current(key, now)
+            if count < self.limit:
+                return 0
+            self.blocked += 1
+            return max(1, int(start + self.window - now))
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._current(key, now)
+            self._data[key] = (start, count + 1)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._data), "limit": self.limit, "window": self.window, "blocked": self.blocked}
+
+email_failures = RateLimiter(LOGIN_MAX_FAILURES_PER_EMAIL, LOGIN_EMAIL_WINDOW)
+ip_attempts = RateLimiter(LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_IP_WINDOW)
+
+def login_throttle_stats() -> dict:
+    return {
+        "email_failures": email_failures.stats(),
+        "ip_attempts": ip_attempts.stats(),
+        "bcrypt": {"workers": PASSWORD_HASH_WORKERS, "queue_max": PASSWORD_QUEUE_MAX, "rounds": BCRYPT_ROUNDS},
+    }
+
 def create_access_token(payload: dict, ttl: int = ACCESS_TOKEN_TTL) -> str:
     to_encode = payload.copy()
     to_encode["exp"] = int(time.time()) + ttl
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGO)
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
+    data = token_cache.get(token)
+    if data is not None:
+        return data
+    data = jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
+    # jamais gardé au-delà de l'expiration du jeton
+    remaining = data.get("exp", time.time() + AUTH_TOKEN_CACHE_TTL) - time.time()
+    if remaining > 0:
+        token_cache.set(token, data, ttl=remaining)
+    return data
+
+def invalidate_user(user_id: int):
+    user_cache.pop(int(user_id))
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
 
 def get_user_by_email(email: str):
-    with psycopg.connect(DB_URL) as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 select id, client_id, full_name, email, password_hash, role
@@ -37,7 +147,16 @@ def get_user_by_email(email: str):
             return dict(zip(keys, row))
 
 def get_user_by_id(user_id: int):
-    with psycopg.connect(DB_URL) as conn:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return dict(user)
+    user = _load_user_by_id(user_id)
+    if user:
+        user_cache.set(user_id, user)
+    return user
+
+def _load_user_by_id(user_id: int):
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 select id, client_id, full_name, email, role
@@ -47,3 +166,42 @@ def get_user_by_id(user_id: int):
             if not row: return None
             keys = ["id","client_id","full_name","email","role"]
             return dict(zip(keys, row))
+
+async def get_user_by_id_async(user_id: int):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return dict(user)
+    user = await _load_user_by_id_async(user_id)
+    if user:
+        user_cache.set(user_id, user)
+    return user
+
+async def _load_user_by_id_async(user_id: int):
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                select id, client_id, full_name, email, role
+                from client_user where id=%s
+            """, (user_id,))
+            row = await cur.fetchone()
+            if not row: return None
+            keys = ["id","client_id","full_name","email","role"]
+            return dict(zip(keys, row))
+
+async def get_user_by_email_async(email: str):
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                select id, client_id, full_name, email, password_hash, role
+                from client_user where email=%s
+            """, (email,))
+            row = await cur.fetchone()
+            if not row:
+                return None
+            keys = ["id","client_id","full_name","email","password_hash","role"]
+            return dict(zip(keys, row))
+
+async def update_password_hash_async(user_id: int, password_hash: str):
+    async with async_connection() as conn:
+        await conn.execute("update client_user set password_hash=%s where id=%s", (password_hash, user_id))
+    invalidate_user(user_id)
@@ -0,0 +1,189 @@
+"""
+Chargement hors ligne des archives BODACC (JSON / CSV / XML, .gz accepté).
+
+    python -m app.bulk_load dumps/*.json.gz [--workers 4] [--batch-size 50000]
+    python -m app.bulk_load scripts/fixtures/bodacc/* --dry-run   # sans base
+
+Lecture en flux (app/sources/bodacc_dump.py), normalisation + classification +
+SIREN dans un pool de processus, écriture par lots via COPY + upsert
+(app/ingest.upsert_staged). Chaque lot validé met à jour le checkpoint du
+fichier (bulk_load_file) dans la même transaction: une relance reprend après
+le dernier lot validé, et saute les fichiers terminés (même taille / mtime).
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from app.db import connection
+from app.ingest import prepare_rows, upsert_staged
+from app.sources.bodacc_dump import iter_records, normalize
+
+BULK_LOAD_WORKERS = int(os.getenv("BULK_LOAD_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# annonces par tâche envoyée au pool / par transaction
+BULK_LOAD_CHUNK = 2000
+BULK_LOAD_BATCH = 50_000
+
+
+def _prepare_chunk(records: list[dict]) -> list[tuple]:
+    # exécuté dans un process du pool (classifieur chargé une fois par process)
+    return prepare_rows([normalize(r) for r in records])
+
+
+def _chunked(it, size: int):
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _prepared(pool, workers: int, records, chunk_size: int):
+    # Soumission bornée (2 tâches par worker): la lecture ne prend pas d'avance
+    # sur le traitement, mémoire constante; l'ordre du fichier est conservé
+    window = deque()
+    limit = 2 * workers
+    for chunk in _chunked(records, chunk_size):
+        window.append((len(chunk), pool.submit(_prepare_chunk, chunk)))
+        if len(window) >= limit:
+            n, fut = window.popleft()
+            yield n, fut.result()
+    while window:
+        n, fut = window.popleft()
+        yield n, fut.result()
+
+
+def _file_key(path: Path) -> tuple[str, int, int]:
+    st = path.stat()
+    return str(path.resolve()), st.st_size, int(st.st_mtime)
+
+
+def _checkpoint(cur, path: Path, restart: bool) -> tuple[int, bool]:
+    """Retourne (annonces déjà chargées, fichier terminé)."""
+    key, size, mtime = _file_key(path)
+    cur.execute("select size, mtime, records_done, finished_at from bulk_load_file where path = %s;", (key,))
+    row = cur.fetchone()
+    if row and not restart and (row[0], row[1]) == (size, mtime):
+        return int(row[2]), row[3] is not None
+    # nouveau fichier, fichier modifié ou restart: repart de zéro
+    cur.execute("""
+        insert into bulk_load_file (path, size, mtime)
+        values (%s, %s, %s)
+        on conflict (path) do update
+          set size = excluded.size, mtime = excluded.mtime, records_done = 0,
+              inserted = 0, updated = 0, skipped = 0, seconds = 0,
+              started_at = now(), finished_at = null;
+    """, (key, size, mtime))
+    return 0, False
+
+
+def load_file(pool, workers: int, path: Path, source: str = "BODACC", batch_size: int = BULK_LOAD_BATCH,
+              chunk_size: int = BULK_LOAD_CHUNK, restart: bool = False) -> dict:
+    with connection() as conn:
+        with conn.cursor() as cur:
+            done, finished = _checkpoint(cur, path, restart)
+    if finished:
+        return {"file": str(path), "status": "already_loaded"}
+
+    key = _file_key(path)[0]
+    records = islice(iter_records(path), done, None)
+    totals = {"records": 0, "inserted": 0, "updated": 0, "skipped": 0}
+    prepared = _prepared(pool, workers, records, chunk_size)
+    while True:
+        # un lot = une transaction: COPY + upsert + checkpoint
+        t0 = time.perf_counter()
+        batch_rows, batch_records = [], 0
+        for n, rows in prepared:
+            batch_rows += rows
+            batch_records += n
+            if batch_records >= batch_size:
+                break
+        if not batch_records:
+            break
+        with connection() as conn:
+            with conn.cursor() as cur:
+                stats = upsert_staged(cur, ((i, *r) for i, r in enumerate(batch_rows)), source)
+                elapsed = time.perf_counter() - t0
+                cur.execute("""
+                    update bulk_load_file
+                       set records_done = records_done + %s,
+                           inserted = inserted + %s, updated = updated + %s, skipped = skipped + %s,
+                           seconds = seconds + %s
+                     where path = %s;
+                """, (batch_records, stats["inserted"], stats["updated"], stats["skipped"],
+                      round(elapsed, 3), key))
+        totals["records"] += batch_records
+        for k in ("inserted", "updated", "skipped"):
+            totals[k] += stats[k]
+        print(f"[bulk-load] {path.name}: +{batch_records} annonces "
+              f"({done + totals['records']} au total, {batch_records / elapsed:,.0f} annonces/s)")
+
+    with connection() as conn:
+        conn.execute("update bulk_load_file set finished_at = now() where path = %s;", (key,))
+    return {"file": str(path), "status": "loaded", "resumed_at": done, **totals}
+
+
+def dry_run_file(pool, workers: int, path: Path, chunk_size: int = BULK_LOAD_CHUNK) -> dict:
+    """Lecture + classification sans base: contrôle d'un dump ou des fixtures."""
+    counts: dict[str, int] = {}
+    records = valid = with_siren = 0
+    for n, rows in _prepared(pool, workers, iter_records(path), chunk_size):
+        records += n
+        for r in rows:
+            if r[4] is not None:
+                valid += 1
+                counts[r[2]] = counts.get(r[2], 0) + 1
+                with_siren += r[0] is not None
+    return {"file": str(path), "status": "dry_run", "records": records, "valid": valid,
+            "with_siren": with_siren, "types": counts}
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Chargement en masse des archives BODACC")
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--workers", type=int, default=BULK_LOAD_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BULK_LOAD_BATCH, help="annonces par transaction")
+    parser.add_argument("--chunk-size", type=int, default=BULK_LOAD_CHUNK, help="annonces par tâche du pool")
+    parser.add_argument("--source", default="BODACC")
+    parser.add_argument("--restart", action="store_true", help="ignore les checkpoints existants")
+    parser.add_argument("--dry-run", action="store_true", help="parse + classe sans écrire en base")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    results = []
+    # spawn: les workers n'héritent ni du pool de connexions ni de ses threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+        for path in args.files:
+            t_file = time.perf_counter()
+            if args.dry_run:
+                res = dry_run_file(pool, args.workers, path, args.chunk_size)
+            else:
+                res = load_file(pool, args.workers, path, args.source, args.batch_size, args.chunk_size, args.restart)
+            secs = time.perf_counter() - t_file
+            res["seconds"] = round(secs, 3)
+            if res.get("records"):
+                res["records_per_sec"] = round(res["records"] / secs, 1)
+            results.append(res)
+            print(json.dumps(res, ensure_ascii=False))
+
+    total = sum(r.get("records", 0) for r in results)
+    secs = time.perf_counter() - t0
+    summary = {"files": len(results), "records": total, "seconds": round(secs, 3),
+               "records_per_sec": round(total / secs, 1) if secs > 0 else None}
+    if not args.dry_run and any(r.get("inserted") or r.get("updated") for r in results):
+        # caches des workers web (autre process): invalidation via NOTIFY
+        from app.cluster import publish_invalidation
+        publish_invalidation(["signals"])
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Caches en mémoire (par process):
+- ResponseCache: corps JSON pré-sérialisés + ETag, bornés en nombre d'entrées et
+  en octets, éviction LRU + TTL, invalidation par tags;
+- TTLCache: petit cache clé -> valeur LRU + TTL (jetons, utilisateurs, ...).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    tags: frozenset
+    expires_at: float
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        # fn(tags) appelée à chaque invalidation locale (diffusion aux autres workers)
+        self.publisher = None
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: tuple, body: bytes, tags=()) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            tags=frozenset(tags),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        if len(body) > self.max_bytes:
+            return entry  # trop gros pour être gardé
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = entry
+            self._bytes += len(body)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, *tags: str, publish: bool = True) -> int:
+        """Supprime les entrées portant au moins un des tags."""
+        wanted = set(tags)
+        with self._lock:
+            keys = [k for k, e in self._data.items() if e.tags & wanted]
+            for k in keys:
+                self._drop(k)
+            self.invalidations += len(keys)
+        if publish and self.publisher is not None:
+            try:
+                self.publisher(tags)
+            except Exception as e:  # le TTL borne la péremption chez les autres workers
+                print(f"[cache] diffusion de l'invalidation impossible: {e}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: tuple):
+        entry = self._data.pop(key)
+        self._bytes -= len(entry.body)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+
+
+def cache_key(path: str, params, *extra) -> tuple:
+    """Clé normalisée: chemin + paramètres non vides triés (+ éléments résolus côté serveur)."""
+    items = sorted((k, str(v).strip()) for k, v in params if str(v).strip() != "")
+    return (path, tuple(items), *extra)
+
+
+class TTLCache:
+    """Cache clé -> valeur borné (LRU) avec expiration; get() renvoie None si absent."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
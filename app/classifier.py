@@ -0,0 +1,99 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+RULES_PATH = Path(os.getenv("SIGNAL_RULES_PATH", Path(__file__).parent / "rules" / "signal_rules.json"))
+
+@dataclass(frozen=True)
+class Rule:
+    type: str
+    weight: int
+    confidence: float
+    priority: int  # plus petit = plus prioritaire
+    patterns: tuple[str, ...]
+
+
+class Classifier:
+    """
+    Table de règles compilée en une liste de sondes (motif minuscule -> résultat)
+    triée par priorité. Chaque extrait est mis en minuscules une seule fois puis
+    sondé par recherche de sous-chaîne (C), avec arrêt au premier motif trouvé:
+    le premier match est donc celui de la règle la plus prioritaire.
+
+    NB: une regex unique (alternance plate ou factorisée en trie) a été mesurée
+    2 à 3x plus lente sous CPython (cf. scripts/bench_classifier.py).
+    """
+
+    def __init__(self, rules: list[Rule], default: tuple[str, int, float]):
+        self.rules = sorted(rules, key=lambda r: r.priority)
+        self.default = default
+        probes: list[tuple[str, tuple[str, int, float]]] = []
+        seen: set[str] = set()
+        for r in self.rules:
+            res = (r.type, r.weight, r.confidence)
+            for p in r.patterns:
+                p = p.lower()
+                # un motif partagé garde la règle prioritaire
+                if p and p not in seen:
+                    seen.add(p)
+                    probes.append((p, res))
+        self._probes = tuple(probes)
+
+    def classify(self, text: str) -> tuple[str, int, float]:
+        txt = text.lower()
+        for p, res in self._probes:
+            if p in txt:
+                return res
+        return self.default
+
+    def classify_batch(self, texts: Iterable[str]) -> list[tuple[str, int, float]]:
+        probes, default = self._probes, self.default
+        out = []
+        append = out.append
+        for text in texts:
+            txt = text.lower()
+            for p, res in probes:
+                if p in txt:
+                    append(res)
+                    break
+            else:
+                append(default)
+        return out
+
+
+def load_rules(path: Path | str = RULES_PATH) -> Classifier:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    rules = [
+        Rule(
+            type=r["type"],
+            weight=int(r["weight"]),
+            confidence=float(r["confidence"]),
+            priority=int(r.get("priority", 100)),
+            patterns=tuple(r["patterns"]),
+        )
+        for r in data.get("rules", [])
+    ]
+    d = data.get("default", {"type": "OTHER", "weight": 30, "confidence": 0.50})
+    return Classifier(rules, (d["type"], int(d["weight"]), float(d["confidence"])))
+
+
+_classifier: Classifier | None = None
+
+def get_classifier() -> Classifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = load_rules()
+    return _classifier
+
+def reload_rules() -> Classifier:
+    global _classifier
+    _classifier = load_rules()
+    return _classifier
+
+def classify(text: str) -> tuple[str, int, float]:
+    return get_classifier().classify(text)
+
+def classify_batch(texts: Iterable[str]) -> list[tuple[str, int, float]]:
+    return get_classifier().classify_batch(texts)
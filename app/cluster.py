@@ -0,0 +1,131 @@
+"""
+Coordination entre workers / réplicas via Postgres:
+- élection d'un leader du scheduler par verrou advisory (un seul process exécute les jobs,
+  un autre reprend automatiquement si sa connexion tombe);
+- diffusion des invalidations des caches en mémoire (LISTEN/NOTIFY): cache de
+  réponses entre workers, fiches utilisateur modifiées en base (trigger client_user).
+"""
+import json
+import os
+import threading
+import uuid
+
+import psycopg
+
+from app.db import DB_URL, connection
+from app.cache import response_cache
+from app.auth import invalidate_user, user_cache
+
+LEADER_POLL_SECONDS = float(os.getenv("LEADER_POLL_SECONDS", "10"))
+CACHE_CHANNEL = "radar_cache"
+# Identifiant du process (les pid peuvent se répéter d'un conteneur à l'autre)
+NODE_ID = uuid.uuid4().hex
+
+# Keepalives client et serveur: la connexion d'un leader mort est coupée vite,
+# ce qui libère le verrou pour un autre worker
+_CONN_KW = dict(
+    autocommit=True,
+    keepalives=1, keepalives_idle=10, keepalives_interval=5, keepalives_count=3,
+    options="-c tcp_keepalives_idle=10 -c tcp_keepalives_interval=5 -c tcp_keepalives_count=3",
+)
+
+
+class LeaderElector(threading.Thread):
+    """
+    Tente périodiquement pg_try_advisory_lock sur une connexion dédiée (hors pool).
+    Le verrou est tenu tant que la connexion vit; le leader la vérifie à chaque tour
+    et appelle on_lost() s'il la perd.
+    """
+
+    def __init__(self, name: str, on_elected, on_lost, poll: float = LEADER_POLL_SECONDS):
+        super().__init__(name=f"leader-{name}", daemon=True)
+        self.lock_name = f"radar:leader:{name}"
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.poll = poll
+        self.is_leader = False
+        self._conn: psycopg.Connection | None = None
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            try:
+                if self._conn is None or self._conn.closed:
+                    self._conn = psycopg.connect(DB_URL, **_CONN_KW)
+                if self.is_leader:
+                    self._conn.execute("select 1;")
+                else:
+                    got = self._conn.execute(
+                        "select pg_try_advisory_lock(hashtext(%s));", (self.lock_name,)
+                    ).fetchone()[0]
+                    if got:
+                        self.is_leader = True
+                        print(f"[leader] {self.lock_name}: élu ({NODE_ID[:8]}, pid {os.getpid()})")
+                        self.on_elected()
+            except Exception as e:
+                print(f"[leader] {self.lock_name}: connexion perdue ({type(e).__name__})")
+                self._drop()
+            self._stop_evt.wait(self.poll)
+        self._drop()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def _drop(self):
+        if self.is_leader:
+            self.is_leader = False
+            self.on_lost()
+        if self._conn is not None:
+            try:
+                self._conn.close()  # libère le verrou côté serveur
+            except Exception:
+                pass
+            self._conn = None
+
+
+def publish_invalidation(tags):
+    with connection() as conn:
+        conn.execute(
+            "select pg_notify(%s, %s);",
+            (CACHE_CHANNEL, json.dumps({"node": NODE_ID, "tags": list(tags)})),
+        )
+
+
+class CacheInvalidationListener(threading.Thread):
+    """Applique localement les invalidations publiées par les autres workers et par la base."""
+
+    def __init__(self):
+        super().__init__(name="cache-listener", daemon=True)
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            try:
+                with psycopg.connect(DB_URL, **_CONN_KW) as conn:
+                    conn.execute(f"listen {CACHE_CHANNEL};")
+                    while not self._stop_evt.is_set():
+                        for n in conn.notifies(timeout=5.0):
+                            msg = json.loads(n.payload)
+                            if msg.get("node") != NODE_ID:
+                                response_cache.invalidate(*msg.get("tags", []), publish=False)
+                            for user_id in msg.get("users", []):
+                                invalidate_user(user_id)
+            except Exception as e:
+                print(f"[cache-listener] reconnexion ({type(e).__name__})")
+                # invalidations possiblement manquées pendant la coupure
+                response_cache.clear()
+                user_cache.clear()
+                self._stop_evt.wait(LEADER_POLL_SECONDS)
+
+    def stop(self):
+        self._stop_evt.set()
+
+
+_listener: CacheInvalidationListener | None = None
+
+def start_cache_sync():
+    global _listener
+    if _listener is None:
+        response_cache.publisher = publish_invalidation
+        _listener = CacheInvalidationListener()
+        _listener.start()
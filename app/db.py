@@ -1,15 +1,118 @@
 import os
+import threading
 import psycopg
 from pathlib import Path
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
 DB_URL = os.getenv("DB_URL", "postgresql://radar:radarpass@db:5432/radar")
 MODELS_PATH = Path(__file__).parent / "models.sql"
 
+# Pool partagé (HTTP + jobs). Taille réglable par env.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+
+_pool: ConnectionPool | None = None
+_async_pool: AsyncConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    Retourne le pool applicatif, créé à la demande (utile pour les scripts CLI).
+    Les connexions sont vérifiées (select 1) avant d'être prêtées.
+    """
+    global _pool
+    if _pool is None:
+        # double vérification: appelé depuis plusieurs threads (jobs, executors),
+        # un seul pool doit être créé
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_URL,
+                    min_size=DB_POOL_MIN,
+                    max_size=max(DB_POOL_MIN, DB_POOL_MAX),
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    check=ConnectionPool.check_connection,
+                    name="radar",
+                    open=True,
+                )
+    return _pool
+
+def connection():
+    """Context manager: emprunte une connexion (commit à la sortie, rollback si exception)."""
+    return get_pool().connection()
+
+def open_pool():
+    # Pas de wait: l'app démarre même si la DB n'est pas encore prête
+    get_pool()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def _stats(pool) -> dict:
+    if pool is None:
+        return {"open": False}
+    stats = pool.get_stats()
+    stats["open"] = not pool.closed
+    stats["min_size"] = pool.min_size
+    stats["max_size"] = pool.max_size
+    return stats
+
+def pool_stats() -> dict:
+    return {**_stats(_pool), "async": _stats(_async_pool)}
+
+# --- Pool async (endpoints de lecture en `async def`), un par boucle d'événements / worker ---
+async def open_async_pool():
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = AsyncConnectionPool(
+            DB_URL,
+            min_size=DB_POOL_MIN,
+            max_size=max(DB_POOL_MIN, DB_POOL_MAX),
+            timeout=DB_POOL_TIMEOUT,
+            max_idle=DB_POOL_MAX_IDLE,
+            check=AsyncConnectionPool.check_connection,
+            name="radar-async",
+            open=False,
+        )
+        await _async_pool.open()
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+def async_connection():
+    """Context manager async: `async with async_connection() as conn:`."""
+    if _async_pool is None:
+        raise RuntimeError("async pool not opened (open_async_pool() au startup)")
+    return _async_pool.connection()
+
 def init_db():
+    """
+    Applique models.sql, convertit signal / company_score_daily en tables
+    partitionnées par mois si ce n'est pas déjà fait (puis rejoue models.sql
+    pour leurs index et triggers) et crée les partitions à venir.
+    """
+    from app.partitions import migrate_to_partitions, ensure_future_partitions
+
     sql = MODELS_PATH.read_text(encoding="utf-8")
     with psycopg.connect(DB_URL, autocommit=True) as conn:
         with conn.cursor() as cur:
             cur.execute(sql)
+        migrated = migrate_to_partitions(conn)
+        if migrated:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+            print(f"[db] tables partitionnées: {migrated}")
+    ensure_future_partitions()
 
 if __name__ == "__main__":
     init_db()
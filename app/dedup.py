@@ -0,0 +1,221 @@
+"""
+Détection des quasi-doublons d'annonces (même événement republié sous une
+autre URL, repris par le BALO ou la presse).
+
+Empreinte SimHash 64 bits de l'extrait (mots + bigrammes), stockée dans
+signal.simhash. Index LSH: l'empreinte est découpée en 8 bandes de 8 bits;
+signal.simhash_bands (colonne générée, index GIN) contient une clé par bande,
+préfixée par company_id. Deux empreintes à distance de Hamming <= 7
+partagent forcément une bande: la recherche ne lit que les signaux de la
+société tombés dans un même seau, puis vérifie la distance exacte.
+
+Un doublon (même société, même type, fenêtre de dates) pointe vers le signal
+le plus ancien de son groupe (signal.dup_of); le scoring ne compte que les
+signaux dont dup_of est nul. Les liens sont recalculés à chaque ingestion ou
+modification: un extrait réécrit peut sortir de son groupe, et une copie plus
+ancienne chargée après coup devient la racine du groupe existant.
+"""
+import hashlib
+import os
+import re
+
+from app.db import connection
+
+DEDUP_WINDOW_DAYS = int(os.getenv("DEDUP_WINDOW_DAYS", "30"))
+# au-delà de 7 (8 bandes - 1), un doublon peut ne partager aucune bande
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "7"))
+SIMHASH_BITS = 64
+
+_WORD_RE = re.compile(r"[^\W\d_]{2,}")
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int | None:
+    """
+    SimHash 64 bits signé (bigint Postgres) des mots et bigrammes de mots du
+    texte; chiffres ignorés (références, montants, dates varient d'une
+    republication à l'autre). None si le texte n'a pas de mots.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    # vote par bit: colonnes des empreintes en binaire (zip/count en C plutôt
+    # qu'une boucle Python de 64 tours par mot)
+    bits = [format(_feature_hash(f), "064b") for f in features]
+    value = 0
+    for i, col in enumerate(zip(*bits)):
+        if 2 * col.count("1") > len(bits):
+            value |= 1 << (SIMHASH_BITS - 1 - i)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+# Périmètre: signaux donnés + membres des groupes dont ils sont canoniques.
+# dup_of remis à nul: un extrait réécrit qui ne matche plus redevient canonique,
+# ses anciens membres sont re-rattachés ci-dessous.
+_RESET_SQL = """
+    with fresh as (
+      select * from unnest(%(ids)s::int[], %(dates)s::date[]) as t(id, event_date)
+    ),
+    scope as (
+      select id, event_date from fresh
+      union
+      select s.id, s.event_date from signal s where s.dup_of = any(%(ids)s::int[])
+    ),
+    reset as (
+      update signal s set dup_of = null
+        from scope c
+       where s.id = c.id and s.event_date = c.event_date and s.dup_of is not null
+      returning 1
+    )
+    select array(select id from scope), array(select event_date from scope);
+"""
+
+_CLUSTER_SQL = """
+    with fresh as (
+      select * from unnest(%(ids)s::int[], %(dates)s::date[]) as t(id, event_date)
+    ),
+    matched as (
+      select n.id, n.event_date, coalesce(o.dup_of, o.id) as canonical
+        from fresh f
+        join signal n on n.id = f.id and n.event_date = f.event_date
+        join lateral (
+          -- candidats: seau LSH commun (même société, une bande égale), même type
+          select o.id, o.dup_of
+            from signal o
+           where o.simhash_bands && n.simhash_bands
+             and o.company_id = n.company_id and o.type = n.type
+             and o.event_date between n.event_date - %(window)s::int and n.event_date + %(window)s::int
+             and (o.event_date, o.id) < (n.event_date, n.id)
+             and bit_count((o.simhash # n.simhash)::bit(64)) <= %(max_dist)s::int
+           order by o.event_date, o.id
+           limit 1
+        ) o on true
+       where n.simhash_bands is not null
+    )
+    update signal s
+       set dup_of = m.canonical
+      from matched m
+     where s.id = m.id and s.event_date = m.event_date
+       and s.dup_of is distinct from m.canonical
+    returning s.id;
+"""
+
+# Copie plus ancienne chargée après coup (archives, rattrapage): les canoniques
+# plus récents qu'elle matche passent sous la racine de son groupe
+_REPOINT_SQL = """
+    with fresh as (
+      select * from unnest(%(ids)s::int[], %(dates)s::date[]) as t(id, event_date)
+    ),
+    roots as (
+      select n.id, n.event_date, n.company_id, n.type, n.simhash, n.simhash_bands,
+             r.id as root, r.event_date as root_date
+        from fresh f
+        join signal n on n.id = f.id and n.event_date = f.event_date
+        join signal r on r.id = coalesce(n.dup_of, n.id)
+       where n.simhash_bands is not null
+    ),
+    repoint as (
+      select distinct on (c.id) c.id, c.event_date, n.root
+        from roots n
+        join signal c
+          on c.simhash_bands && n.simhash_bands
+         and c.company_id = n.company_id and c.type = n.type
+         and c.event_date between n.event_date - %(window)s::int and n.event_date + %(window)s::int
+         and (c.event_date, c.id) > (n.event_date, n.id)
+         and (c.event_date, c.id) > (n.root_date, n.root)
+         and c.dup_of is null
+         and bit_count((c.simhash # n.simhash)::bit(64)) <= %(max_dist)s::int
+       order by c.id, n.root_date, n.root
+    )
+    update signal s
+       set dup_of = p.root
+      from repoint p
+     where s.id = p.id and s.event_date = p.event_date
+    returning s.id;
+"""
+
+# dup_of pointe toujours vers un signal plus ancien: la remontée termine
+_FLATTEN_SQL = """
+    update signal s
+       set dup_of = p.dup_of
+      from signal p
+     where p.id = any(%(ids)s::int[]) and p.dup_of is not null
+       and s.dup_of = p.id
+    returning s.id;
+"""
+
+
+def cluster_signals(cur, ids: list[int], dates: list) -> int:
+    """
+    Rattache les signaux (id, event_date) donnés au plus ancien quasi-doublon
+    (même société, même type); retourne le nombre de signaux marqués doublons.
+    Les liens existants des signaux donnés (et de leurs membres) sont recalculés;
+    un signal plus ancien que le canonique d'un groupe en devient la racine.
+    Le trigger score_dirty fait rescorer les jours concernés.
+    """
+    if not ids:
+        return 0
+    cur.execute(_RESET_SQL, {"ids": ids, "dates": dates})
+    ids, dates = cur.fetchone()
+    params = {"ids": ids, "dates": dates, "window": DEDUP_WINDOW_DAYS, "max_dist": DEDUP_MAX_DISTANCE}
+    cur.execute(_CLUSTER_SQL, params)
+    linked = len(cur.fetchall())
+    _flatten(cur, ids)
+    cur.execute(_REPOINT_SQL, params)
+    repointed = [r[0] for r in cur.fetchall()]
+    _flatten(cur, repointed)
+    return linked + len(repointed)
+
+
+def _flatten(cur, ids: list[int]) -> None:
+    # chaînes créées (canonique devenu doublon): ses membres remontent à la racine
+    if not ids:
+        return
+    while True:
+        cur.execute(_FLATTEN_SQL, {"ids": ids})
+        if not cur.fetchall():
+            break
+
+
+def backfill_fingerprints(batch_size: int = 5000) -> dict:
+    """Empreintes des signaux existants (simhash nul), puis regroupement, par lots."""
+    fingerprinted = duplicates = 0
+    while True:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    select id, event_date, excerpt
+                      from signal
+                     where simhash is null
+                     order by event_date, id
+                     limit %s
+                       for update skip locked;
+                """, (batch_size,))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                ids = [r[0] for r in rows]
+                dates = [r[1] for r in rows]
+                # 0 = texte sans mots: marqué traité, exclu des comparaisons
+                hashes = [simhash(r[2]) or 0 for r in rows]
+                cur.execute("""
+                    update signal s
+                       set simhash = t.h
+                      from unnest(%s::int[], %s::date[], %s::bigint[]) as t(id, event_date, h)
+                     where s.id = t.id and s.event_date = t.event_date;
+                """, (ids, dates, hashes))
+                duplicates += cluster_signals(cur, ids, dates)
+        fingerprinted += len(rows)
+        if len(rows) < batch_size:
+            break
+    return {"fingerprinted": fingerprinted, "duplicates": duplicates}
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(backfill_fingerprints(), indent=2))
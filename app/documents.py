@@ -0,0 +1,298 @@
+"""
+Génération des documents PDF par client: brief quotidien (daily_brief) et
+digest hebdomadaire (weekly_digest), à partir des alertes (client_alert) et
+des signaux canoniques des sociétés concernées.
+
+    python -m app.documents daily [--date 2026-10-16] [--workers 4] [--force]
+    python -m app.documents weekly [--date 2026-10-16]
+
+- Données de tous les clients lues en quelques requêtes ensemblistes.
+- Empreinte sha256 du contenu par document: si elle est identique à celle de
+  document_pdf et que le fichier existe, le document n'est pas re-rendu.
+- Rendu + écriture dans un pool de processus (spawn, soumission bornée);
+  écriture atomique (fichier temporaire + fsync + rename).
+- document_pdf alimenté par un upsert unnest unique en fin de run.
+"""
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.cache import response_cache
+from app.db import connection
+from app.pdf import render_pdf
+
+DOCUMENTS_DIR = Path(os.getenv("DOCUMENTS_DIR", "/data/documents"))
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# sociétés par document (les plus fortes alertes de la période)
+DOCUMENT_MAX_COMPANIES = int(os.getenv("DOCUMENT_MAX_COMPANIES", "25"))
+EXCERPT_MAX_CHARS = 400
+KINDS = ("daily_brief", "weekly_digest")
+TYPE_LABELS = {
+    "PROC_COLLECTIVE": "Procédure collective",
+    "SALE_OF_BUSINESS": "Cession de fonds",
+    "M&A_PROJECT": "Projet de fusion/acq.",
+    "OTHER": "Autre",
+}
+
+
+def period_of(kind: str, day: datetime.date) -> tuple[datetime.date, datetime.date]:
+    """Bornes incluses: le jour, ou la semaine ISO (lundi-dimanche) contenant day."""
+    if kind == "daily_brief":
+        return day, day
+    start = day - datetime.timedelta(days=day.weekday())
+    return start, start + datetime.timedelta(days=6)
+
+
+def week_label(day: datetime.date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _load(kind: str, d0: datetime.date, d1: datetime.date, client_ids: list[int] | None) -> dict[int, dict]:
+    """Contenu des documents de la période pour les clients actifs: {client_id: payload}."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                select id, name from client
+                 where is_active and (%(ids)s::int[] is null or id = any(%(ids)s::int[]))
+                 order by id;
+            """, {"ids": client_ids})
+            docs = {cid: {"client": name, "companies": []} for cid, name in cur.fetchall()}
+            if not docs:
+                return docs
+
+            # meilleure alerte par (client, société) sur la période, top N par client
+            cur.execute("""
+                with best as (
+                  select distinct on (a.client_id, a.company_id)
+                         a.client_id, a.company_id, a.score, a.score_date, a.top_signal_type, a.naf_prefix
+                    from client_alert a
+                   where a.client_id = any(%(ids)s::int[])
+                     and a.score_date between %(d0)s and %(d1)s
+                   order by a.client_id, a.company_id, a.score desc, a.score_date desc
+                ),
+                ranked as (
+                  select b.*, row_number() over (partition by b.client_id
+                                                 order by b.score desc, b.company_id) as rk
+                    from best b
+                )
+                select r.client_id, r.company_id, co.name, co.siren, co.naf,
+                       r.score, r.score_date, r.top_signal_type, r.naf_prefix
+                  from ranked r
+                  join company co on co.id = r.company_id
+                 where r.rk <= %(top)s
+                 order by r.client_id, r.rk;
+            """, {"ids": list(docs), "d0": d0, "d1": d1, "top": DOCUMENT_MAX_COMPANIES})
+            companies = set()
+            for cid, company_id, name, siren, naf, score, sdate, top, prefix in cur.fetchall():
+                docs[cid]["companies"].append({
+                    "id": company_id, "name": name, "siren": siren, "naf": naf,
+                    "score": float(score), "score_date": sdate.isoformat(), "top": top,
+                    "naf_prefix": prefix, "signals": [],
+                })
+                companies.add(company_id)
+
+            signals: dict[int, list] = {}
+            if companies:
+                cur.execute("""
+                    select company_id, event_date, type, left(excerpt, %s), url
+                      from signal
+                     where company_id = any(%s::int[])
+                       and event_date between %s and %s
+                       and dup_of is null
+                     order by company_id, event_date, id;
+                """, (EXCERPT_MAX_CHARS, list(companies), d0, d1))
+                for company_id, edate, sig_type, excerpt, url in cur.fetchall():
+                    signals.setdefault(company_id, []).append(
+                        {"date": edate.isoformat(), "type": sig_type, "excerpt": excerpt, "url": url})
+            for doc in docs.values():
+                for c in doc["companies"]:
+                    c["signals"] = signals.get(c["id"], [])
+    return docs
+
+
+def content_hash(kind: str, d0: datetime.date, payload: dict) -> str:
+    raw = json.dumps({"kind": kind, "period": d0.isoformat(), **payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _blocks(kind: str, d0: datetime.date, d1: datetime.date, payload: dict) -> list[tuple[str, str]]:
+    if kind == "daily_brief":
+        title = f"Brief quotidien du {d0.strftime('%d/%m/%Y')}"
+    else:
+        title = f"Digest hebdomadaire {week_label(d0)} ({d0.strftime('%d/%m')} - {d1.strftime('%d/%m/%Y')})"
+    blocks = [("h1", title), ("p", payload["client"]), ("p", "")]
+    if not payload["companies"]:
+        blocks.append(("p", "Aucune société au-dessus de votre seuil d'alerte sur la période."))
+    for c in payload["companies"]:
+        head = f"{c['name']} (SIREN {c['siren'] or 'n/c'}) - score {c['score']:g}"
+        blocks.append(("h2", head))
+        blocks.append(("small", f"NAF {c['naf'] or 'n/c'} - {TYPE_LABELS.get(c['top'], c['top'] or 'Autre')} "
+                                f"- score du {c['score_date']}"))
+        for s in c["signals"]:
+            blocks.append(("p", f"{s['date']} - {TYPE_LABELS.get(s['type'], s['type'])} : {s['excerpt']}"))
+            blocks.append(("small", s["url"]))
+        blocks.append(("p", ""))
+    return blocks
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # fichier temporaire du même répertoire + rename: jamais de PDF tronqué lisible
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _render_job(job: dict) -> int:
+    # exécuté dans un process du pool: mise en page, PDF, écriture
+    d0 = datetime.date.fromisoformat(job["d0"])
+    d1 = datetime.date.fromisoformat(job["d1"])
+    data = render_pdf(_blocks(job["kind"], d0, d1, job["payload"]), title=job["title"])
+    _write_atomic(DOCUMENTS_DIR / job["path"], data)
+    return len(data)
+
+
+def _relative_path(client_id: int, kind: str, d0: datetime.date) -> str:
+    stem = d0.isoformat() if kind == "daily_brief" else week_label(d0)
+    return f"{client_id}/{kind}/{stem}.pdf"
+
+
+def _rendered(pool, workers: int, jobs):
+    # Soumission bornée (2 tâches par worker), comme app/bulk_load.py
+    window = deque()
+    for job in jobs:
+        window.append((job, pool.submit(_render_job, job)))
+        if len(window) >= 2 * workers:
+            job, fut = window.popleft()
+            yield job, fut.result()
+    while window:
+        job, fut = window.popleft()
+        yield job, fut.result()
+
+
+def _upsert_rows(rows: list[tuple]) -> None:
+    if not rows:
+        return
+    cols = list(zip(*rows))
+    with connection() as conn:
+        conn.execute("""
+            insert into document_pdf (client_id, company_id, kind, path, published_at, score,
+                                      top_signal_type, sector_tag, week_label, period_start,
+                                      title, content_hash, size_bytes)
+            select * from unnest(%s::int[], %s::int[], %s::text[], %s::text[], %s::timestamptz[],
+                                 %s::numeric[], %s::text[], %s::text[], %s::text[], %s::date[],
+                                 %s::text[], %s::text[], %s::int[])
+            on conflict (client_id, kind, period_start) do update
+              set company_id = excluded.company_id, path = excluded.path,
+                  published_at = excluded.published_at, score = excluded.score,
+                  top_signal_type = excluded.top_signal_type, sector_tag = excluded.sector_tag,
+                  week_label = excluded.week_label, title = excluded.title,
+                  content_hash = excluded.content_hash, size_bytes = excluded.size_bytes;
+        """, cols)
+
+
+def generate_documents(kind: str = "daily_brief", day=None, workers: int = DOCUMENT_WORKERS,
+                       client_ids: list[int] | None = None, force: bool = False) -> dict:
+    """
+    Génère le document kind de la période contenant day (défaut: aujourd'hui)
+    pour chaque client actif. Retourne les compteurs et le débit (documents/s).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}")
+    t0 = time.perf_counter()
+    day = datetime.date.fromisoformat(str(day)) if day else datetime.date.today()
+    d0, d1 = period_of(kind, day)
+    docs = _load(kind, d0, d1, client_ids)
+
+    with connection() as conn:
+        existing = dict(conn.execute("""
+            select client_id, content_hash from document_pdf
+             where kind = %s and period_start = %s and client_id = any(%s::int[]);
+        """, (kind, d0, list(docs))).fetchall())
+
+    jobs, skipped = [], 0
+    for cid, payload in docs.items():
+        digest = content_hash(kind, d0, payload)
+        path = _relative_path(cid, kind, d0)
+        if not force and existing.get(cid) == digest and (DOCUMENTS_DIR / path).exists():
+            skipped += 1
+            continue
+        top = payload["companies"][0] if payload["companies"] else None
+        title = ("Brief quotidien " if kind == "daily_brief" else "Digest hebdomadaire ") + \
+            (d0.isoformat() if kind == "daily_brief" else week_label(d0))
+        jobs.append({
+            "client_id": cid, "kind": kind, "d0": d0.isoformat(), "d1": d1.isoformat(),
+            "path": path, "title": title, "hash": digest, "payload": payload, "top": top,
+        })
+    t_load = time.perf_counter() - t0
+
+    rows, size = [], 0
+    if jobs:
+        published = datetime.datetime.now(datetime.timezone.utc)
+        ctx = multiprocessing.get_context("spawn")
+        workers = max(1, min(workers, len(jobs)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            for job, nbytes in _rendered(pool, workers, jobs):
+                top = job["top"] or {}
+                names = ", ".join(c["name"] for c in job["payload"]["companies"][:10])
+                rows.append((
+                    job["client_id"], top.get("id"), kind, job["path"], published, top.get("score"),
+                    top.get("top"), (top.get("naf_prefix") or (top.get("naf") or "")[:2]) or None,
+                    week_label(d0), d0, f"{job['title']} - {names}" if names else job["title"],
+                    job["hash"], nbytes,
+                ))
+                size += nbytes
+    _upsert_rows(rows)
+    if rows:
+        response_cache.invalidate("documents")
+
+    secs = time.perf_counter() - t0
+    return {
+        "kind": kind,
+        "period": [d0.isoformat(), d1.isoformat()],
+        "clients": len(docs),
+        "rendered": len(rows),
+        "skipped_unchanged": skipped,
+        "bytes": size,
+        "load_seconds": round(t_load, 3),
+        "seconds": round(secs, 3),
+        "documents_per_sec": round(len(rows) / (secs - t_load), 1) if rows and secs > t_load else None,
+    }
+
+
+def generate_daily_briefs() -> dict:
+    return generate_documents("daily_brief")
+
+
+def generate_weekly_digests() -> dict:
+    # lancé le lundi: digest de la semaine écoulée
+    return generate_documents("weekly_digest", datetime.date.today() - datetime.timedelta(days=7))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Génération des briefs / digests PDF")
+    parser.add_argument("kind", choices=["daily", "weekly"])
+    parser.add_argument("--date", default=None)
+    parser.add_argument("--workers", type=int, default=DOCUMENT_WORKERS)
+    parser.add_argument("--client", type=int, action="append", help="limiter à ce(s) client(s)")
+    parser.add_argument("--force", action="store_true", help="re-rend même si le contenu est inchangé")
+    args = parser.parse_args()
+    kind = "daily_brief" if args.kind == "daily" else "weekly_digest"
+    res = generate_documents(kind, args.date, args.workers, args.client, args.force)
+    print(json.dumps(res, indent=2))
@@ -0,0 +1,189 @@
+"""
+Résolution des entités citées dans les annonces: SIREN / SIRET (clé de Luhn
+vérifiée), nom de la société, puis SIREN -> company_id via un cache borné
+préchargé depuis company (une société déjà connue ne coûte aucune écriture).
+"""
+import os
+import re
+
+from app.cache import TTLCache
+
+COMPANY_CACHE_MAX_ENTRIES = int(os.getenv("COMPANY_CACHE_MAX_ENTRIES", "200000"))
+COMPANY_CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL", "86400"))
+UNKNOWN_NAME = "Inconnue"
+
+# Mention explicite: "SIREN 512 345 678", "SIRET 51234567800012", "RCS Lyon B 512 345 678"
+_LABELLED_RE = re.compile(
+    r"\b(?:SIRE[NT]|R\.?\s?C\.?\s?S\.?)\b[^\d\n]{0,30}?"
+    r"(?<!\d)(\d{3}[  .]?\d{3}[  .]?\d{3}(?:[  .]?\d{5})?)(?!\d)",
+    re.IGNORECASE,
+)
+# Numéro nu: 9 ou 14 chiffres contigus, pas au milieu d'un nombre plus long
+_BARE_RE = re.compile(r"(?<![\d.,])(\d{14}|\d{9})(?![\d,]|\.\d)")
+_SEP_RE = re.compile(r"[  .]")
+
+_NAME_TOKEN_RE = re.compile(r"^[A-Z0-9ÀÂÄÇÉÈÊËÎÏÔÖÙÛÜŸ&'’.\-]*[A-ZÀÂÄÇÉÈÊËÎÏÔÖÙÛÜŸ][A-Z0-9ÀÂÄÇÉÈÊËÎÏÔÖÙÛÜŸ&'’.\-]*$")
+_NAME_STOP = {"SIREN", "SIRET", "RCS", "R.C.S.", "N°", "BODACC"}
+_LEGAL_FORMS = {"SA", "SAS", "SASU", "SARL", "EURL", "SCI", "SNC", "SCA", "SCOP", "SELARL", "GIE"}
+_LA_POSTE_SIREN = "356000000"
+
+
+def luhn_ok(digits: str) -> bool:
+    total = 0
+    for i, c in enumerate(reversed(digits)):
+        d = ord(c) - 48
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+
+def valid_siren(siren: str) -> bool:
+    return len(siren) == 9 and siren.isdigit() and luhn_ok(siren)
+
+
+def valid_siret(siret: str) -> bool:
+    if len(siret) != 14 or not siret.isdigit():
+        return False
+    if siret.startswith(_LA_POSTE_SIREN):
+        # établissements de La Poste: somme des chiffres multiple de 5
+        return sum(map(int, siret)) % 5 == 0
+    return valid_siren(siret[:9]) and luhn_ok(siret)
+
+
+def _siren_of(number: str) -> str | None:
+    digits = _SEP_RE.sub("", number)
+    if len(digits) == 14:
+        return digits[:9] if valid_siret(digits) else None
+    return digits if valid_siren(digits) else None
+
+
+def find_siren(text: str) -> tuple[str | None, int]:
+    """
+    Premier SIREN valide du texte (mention SIREN/SIRET/RCS d'abord, sinon
+    numéro nu de 9/14 chiffres), et la position de début de la mention (-1).
+    """
+    for m in _LABELLED_RE.finditer(text):
+        siren = _siren_of(m.group(1))
+        if siren:
+            return siren, m.start()
+    for m in _BARE_RE.finditer(text):
+        siren = _siren_of(m.group(1))
+        if siren:
+            return siren, m.start()
+    return None, -1
+
+
+def extract_company_name(text: str, siren_pos: int = -1) -> str | None:
+    """
+    Nom en capitales qui précède la mention du SIREN ("... pour SOCIETE DURAND
+    SAS (SIREN ...)"), sinon première suite de capitales contenant une forme
+    juridique. None si rien de plausible.
+    """
+    if siren_pos > 0:
+        tokens = text[max(0, siren_pos - 120):siren_pos].rstrip(" (,:;-–").split()
+        name = []
+        for tok in reversed(tokens):
+            tok = tok.strip("(),;:«»\"")
+            if not tok or tok.upper() in _NAME_STOP or not _NAME_TOKEN_RE.match(tok):
+                break
+            name.append(tok)
+        name.reverse()
+        if name and not (len(name) == 1 and name[0] in _LEGAL_FORMS):
+            return " ".join(name).rstrip(".")
+    run: list[str] = []
+    for tok in text.split() + [""]:
+        tok = tok.strip("(),;:«»\"")
+        if tok and tok.upper() not in _NAME_STOP and _NAME_TOKEN_RE.match(tok):
+            run.append(tok)
+            continue
+        if len(run) >= 2 and any(t.rstrip(".") in _LEGAL_FORMS for t in run):
+            return " ".join(run).rstrip(".")
+        run = []
+    return None
+
+
+# --- SIREN -> company_id ---
+company_cache = TTLCache(COMPANY_CACHE_MAX_ENTRIES, COMPANY_CACHE_TTL)
+_warmed = False
+
+
+def warm_company_cache(cur, limit: int = COMPANY_CACHE_MAX_ENTRIES) -> int:
+    """Précharge les sociétés les plus récentes (une requête). Valeur: (id, nom connu)."""
+    global _warmed
+    cur.execute("""
+        select siren, id, name <> %s
+          from company
+         where siren is not null
+         order by updated_at desc nulls last, id desc
+         limit %s;
+    """, (UNKNOWN_NAME, limit))
+    n = 0
+    for siren, cid, named in cur.fetchall():
+        company_cache.set(siren, (cid, named))
+        n += 1
+    _warmed = True
+    return n
+
+
+def resolve_companies(cur, names: dict[str, str | None]) -> tuple[dict[str, int], int]:
+    """
+    SIREN -> company_id pour le lot, et nombre de sociétés créées. Les SIREN en
+    cache ne touchent pas la base; les autres sont créés (nom extrait, sinon
+    'Inconnue') ou relus en une requête. Seule écriture sur une société connue:
+    compléter un nom 'Inconnue'.
+    """
+    if not _warmed:
+        warm_company_cache(cur)
+    ids: dict[str, int] = {}
+    missing, rename = [], []
+    created = 0
+    for siren, name in names.items():
+        hit = company_cache.get(siren)
+        if hit is None:
+            missing.append(siren)
+            continue
+        ids[siren] = hit[0]
+        if name and not hit[1]:
+            rename.append(siren)
+
+    if missing:
+        cur.execute("""
+            with input as (
+              select siren, coalesce(name, %s) as name
+                from unnest(%s::text[], %s::text[]) as t(siren, name)
+            ),
+            ins as (
+              insert into company (country, siren, name)
+              select 'FR', siren, name from input
+              on conflict (siren) do nothing
+              returning id, siren, name <> %s as named
+            )
+            select id, siren, named, true from ins
+            union all
+            select c.id, c.siren, c.name <> %s, false
+              from company c join input i on i.siren = c.siren
+             where not exists (select 1 from ins where ins.siren = c.siren);
+        """, (UNKNOWN_NAME, missing, [names[s] for s in missing], UNKNOWN_NAME, UNKNOWN_NAME))
+        for cid, siren, named, new in cur.fetchall():
+            ids[siren] = cid
+            if new:
+                # pas encore validée: mise en cache au prochain passage (lecture)
+                created += 1
+                continue
+            company_cache.set(siren, (cid, named))
+            if names[siren] and not named:
+                rename.append(siren)
+
+    if rename:
+        cur.execute("""
+            update company c
+               set name = t.name, updated_at = now()
+              from unnest(%s::text[], %s::text[]) as t(siren, name)
+             where c.siren = t.siren and c.name = %s;
+        """, (rename, [names[s] for s in rename], UNKNOWN_NAME))
+        for siren in rename:
+            company_cache.set(siren, (ids[siren], True))
+    return ids, created
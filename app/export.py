@@ -0,0 +1,134 @@
+"""
+Export en flux (NDJSON / CSV, gzip optionnel) des signaux et des scores.
+
+Lecture par curseur serveur nommé (fetch par paquets de EXPORT_FETCH_SIZE
+lignes), encodage et compression par paquets: la mémoire reste constante
+quelle que soit la taille de l'export. Le nombre d'exports simultanés par
+worker est borné (chacun garde une connexion du pool pendant toute sa durée).
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import zlib
+from typing import AsyncIterator
+
+from app.db import async_connection
+
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "5000"))
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+# taille visée des morceaux envoyés au client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+_export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+
+SIGNAL_COLUMNS = ["id", "company_id", "siren", "company_name", "source", "type",
+                  "event_date", "url", "excerpt", "weight", "confidence"]
+SCORE_COLUMNS = ["company_id", "siren", "company_name", "score_date", "score_total", "top_signal_type"]
+
+
+def signals_query(date_from=None, date_to=None, sig_type=None, label=None) -> tuple[str, list]:
+    where, params = [], []
+    if date_from:
+        where.append("s.event_date >= %s::date")
+        params.append(date_from)
+    if date_to:
+        where.append("s.event_date <= %s::date")
+        params.append(date_to)
+    if sig_type:
+        where.append("s.type = %s")
+        params.append(sig_type)
+    if label:
+        where.append("exists (select 1 from signal_feedback_count f "
+                     "where f.signal_id = s.id and f.label = %s and f.n > 0)")
+        params.append(label)
+    where_sql = ("where " + " and ".join(where)) if where else ""
+    # types convertis côté base: les lignes sont sérialisables telles quelles
+    return f"""
+        select s.id, s.company_id, c.siren, c.name, s.source, s.type,
+               s.event_date::text, s.url, s.excerpt, s.weight, s.confidence::float8
+          from signal s
+     left join company c on c.id = s.company_id
+          {where_sql}
+      order by s.event_date, s.id
+    """, params
+
+
+def scores_query(date_from=None, date_to=None, sig_type=None, min_score=None) -> tuple[str, list]:
+    where, params = [], []
+    if date_from:
+        where.append("cs.score_date >= %s::date")
+        params.append(date_from)
+    if date_to:
+        where.append("cs.score_date <= %s::date")
+        params.append(date_to)
+    if sig_type:
+        where.append("cs.top_signal_type = %s")
+        params.append(sig_type)
+    if min_score is not None:
+        where.append("cs.score_total >= %s")
+        params.append(min_score)
+    where_sql = ("where " + " and ".join(where)) if where else ""
+    return f"""
+        select cs.company_id, c.siren, c.name, cs.score_date::text,
+               cs.score_total::float8, cs.top_signal_type
+          from company_score_daily cs
+          join company c on c.id = cs.company_id
+          {where_sql}
+      order by cs.score_date, cs.company_id
+    """, params
+
+
+def _encode_ndjson(columns: list[str], rows: list[tuple]) -> str:
+    dumps = json.dumps
+    return "".join(dumps(dict(zip(columns, r)), ensure_ascii=False) + "\n" for r in rows)
+
+
+def _encode_csv(rows: list[tuple]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+async def stream_export(
+    sql: str,
+    params: list,
+    columns: list[str],
+    fmt: str = "ndjson",
+    gzip: bool = False,
+) -> AsyncIterator[bytes]:
+    """Produit l'export par morceaux d'environ EXPORT_CHUNK_BYTES octets."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    pending: list[bytes] = []
+    pending_size = 0
+
+    def out(data: bytes) -> bytes:
+        return gz.compress(data) if gz else data
+
+    if fmt == "csv":
+        pending.append(out(_encode_csv([columns]).encode("utf-8")))
+
+    async with _export_slots:
+        async with async_connection() as conn:
+            # curseur nommé = curseur côté serveur, dans la transaction de la connexion
+            async with conn.cursor(name="radar_export") as cur:
+                await cur.execute(sql, params)
+                while True:
+                    rows = await cur.fetchmany(EXPORT_FETCH_SIZE)
+                    if not rows:
+                        break
+                    text = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(columns, rows)
+                    data = out(text.encode("utf-8"))
+                    if data:
+                        pending.append(data)
+                        pending_size += len(data)
+                    if pending_size >= EXPORT_CHUNK_BYTES:
+                        yield b"".join(pending)
+                        pending, pending_size = [], 0
+            await conn.rollback()  # lecture seule: rien à valider
+
+    if gz:
+        pending.append(gz.flush())
+    if pending:
+        yield b"".join(pending)
@@ -0,0 +1,148 @@
+"""
+Feedback analystes: écriture par lots et compteurs matérialisés par (signal, label).
+
+signal_feedback_count est maintenu par trigger (models.sql) dans la transaction
+qui écrit signal_feedback; rebuild_counts() recalcule tout depuis la source,
+pour les contrôles de cohérence ou après une écriture hors triggers.
+"""
+from app.db import connection, async_connection
+
+ALLOWED_LABELS = ("reliable", "unclear", "broken_link", "false_positive")
+NOTE_MAX_LEN = 2000
+
+
+def upsert_feedback_batch(user_id: int, entries: list[dict]) -> list[dict]:
+    """
+    Enregistre le feedback d'un analyste sur plusieurs signaux: un contrôle
+    d'existence et un upsert pour tout le lot. Retourne un résultat par entrée,
+    dans l'ordre reçu (status: ok | not_found | invalid_label | superseded).
+    Pour un même signal présent plusieurs fois, la dernière entrée l'emporte.
+    """
+    results: list[dict | None] = [None] * len(entries)
+    last: dict[int, int] = {}
+    for i, e in enumerate(entries):
+        if e["label"] not in ALLOWED_LABELS:
+            results[i] = {"signal_id": e["signal_id"], "status": "invalid_label"}
+            continue
+        if e["signal_id"] in last:
+            prev = last[e["signal_id"]]
+            results[prev] = {"signal_id": e["signal_id"], "status": "superseded"}
+        last[e["signal_id"]] = i
+
+    # ordre par signal_id: verrous pris dans le même ordre par les lots concurrents
+    keep = sorted(last.items())
+    ids = [sid for sid, _ in keep]
+    labels = [entries[i]["label"] for _, i in keep]
+    notes = [(entries[i].get("note") or "").strip()[:NOTE_MAX_LEN] for _, i in keep]
+
+    rows = {}
+    if ids:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    with input as (
+                      select t.sid, t.label, nullif(t.note, '') as note
+                        from unnest(%s::int[], %s::text[], %s::text[]) as t(sid, label, note)
+                        join signal s on s.id = t.sid
+                    )
+                    insert into signal_feedback (signal_id, user_id, label, note)
+                    select sid, %s, label, note from input order by sid
+                    on conflict (signal_id, user_id) do update
+                        set label = excluded.label,
+                            note  = excluded.note,
+                            created_at = now()
+                    returning id, signal_id, user_id, label, note, created_at;
+                """, (ids, labels, notes, user_id))
+                for r in cur.fetchall():
+                    rows[r[1]] = r
+
+    for sid, i in keep:
+        r = rows.get(sid)
+        if r is None:
+            results[i] = {"signal_id": sid, "status": "not_found"}
+        else:
+            results[i] = {"signal_id": sid, "status": "ok", "item": {
+                "id": r[0], "signal_id": r[1], "user_id": r[2],
+                "label": r[3], "note": r[4], "created_at": r[5].isoformat(),
+            }}
+    return results
+
+
+async def feedback_counts(signal_ids: list[int]) -> dict[int, dict[str, int]]:
+    """{signal_id: {label: n}} pour une liste de signaux (lecture des compteurs)."""
+    counts: dict[int, dict[str, int]] = {sid: {} for sid in signal_ids}
+    if not signal_ids:
+        return counts
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                select signal_id, label, n
+                  from signal_feedback_count
+                 where signal_id = any(%s) and n > 0;
+            """, (signal_ids,))
+            for sid, lbl, n in await cur.fetchall():
+                counts[sid][lbl] = int(n)
+    return counts
+
+
+def rebuild_counts(dry_run: bool = False) -> dict:
+    """
+    Compare signal_feedback_count au GROUP BY de signal_feedback et corrige les
+    écarts (dry_run=True: compte seulement). Les écritures de feedback sont
+    bloquées le temps du recalcul pour comparer un état stable.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("lock table signal_feedback in share mode;")
+            cur.execute("""
+                with expected as (
+                  select signal_id, label, count(*)::int as n
+                    from signal_feedback
+                   group by 1, 2
+                )
+                select count(*) filter (where c.signal_id is null),
+                       count(*) filter (where e.signal_id is null and c.n <> 0),
+                       count(*) filter (where e.n <> c.n)
+                  from expected e
+             full join signal_feedback_count c
+                    on c.signal_id = e.signal_id and c.label = e.label;
+            """)
+            missing, extra, wrong = (int(v) for v in cur.fetchone())
+            fixed = 0
+            if not dry_run and (missing or extra or wrong):
+                cur.execute("""
+                    with expected as (
+                      select signal_id, label, count(*)::int as n
+                        from signal_feedback
+                       group by 1, 2
+                    ),
+                    up as (
+                      insert into signal_feedback_count (signal_id, label, n)
+                      select signal_id, label, n from expected
+                      on conflict (signal_id, label) do update
+                        set n = excluded.n
+                      where signal_feedback_count.n <> excluded.n
+                      returning 1
+                    ),
+                    del as (
+                      delete from signal_feedback_count c
+                       where not exists (
+                         select 1 from expected e
+                          where e.signal_id = c.signal_id and e.label = c.label
+                       )
+                      returning 1
+                    )
+                    select (select count(*) from up) + (select count(*) from del);
+                """)
+                fixed = int(cur.fetchone()[0])
+    return {"missing": missing, "extra": extra, "wrong": wrong, "fixed": fixed}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Contrôle / reconstruction des compteurs de feedback")
+    parser.add_argument("--rebuild", action="store_true", help="corrige les écarts (sinon contrôle seul)")
+    args = parser.parse_args()
+    print(json.dumps(rebuild_counts(dry_run=not args.rebuild), indent=2))
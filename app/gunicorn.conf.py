@@ -0,0 +1,16 @@
+# Mode multi-workers: gunicorn + workers uvicorn.
+#   gunicorn -c app/gunicorn.conf.py app.main:app
+# Chaque worker a son propre pool DB (DB_POOL_MAX): garder
+# WEB_CONCURRENCY * DB_POOL_MAX (+ 2 connexions dédiées par worker) < max_connections.
+# Un seul worker (élu par verrou advisory Postgres) exécute les jobs planifiés.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Workers async: un par cœur suffit (pas de 2n+1 comme pour des workers sync)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
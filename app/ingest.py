@@ -0,0 +1,192 @@
+import datetime
+from typing import Iterable
+
+from app.db import connection
+from app.classifier import classify_batch
+from app.cache import response_cache
+from app.dedup import simhash, cluster_signals
+from app.entities import find_siren, extract_company_name, resolve_companies
+from app.partitions import ensure_months_for_dates
+
+
+def extract_siren(text: str) -> str | None:
+    return find_siren(text)[0]
+
+
+def _event_date(value) -> datetime.date | None:
+    # Date invalide -> None: l'annonce est ignorée au lieu de faire échouer le COPY
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def prepare_rows(items: list[dict]) -> list[tuple]:
+    """
+    Valide, classe et extrait SIREN + nom de société d'un paquet d'annonces,
+    sans accès base (appelable depuis un process pool). Une ligne de staging
+    par annonce, sans ord: (siren, company_name, type, event_date, url, excerpt,
+    weight, confidence, simhash), tout à None si l'annonce est incomplète ou
+    si sa date est invalide (comptée "skipped").
+    """
+    dates = [_event_date(it["event_date"]) if it.get("event_date") else None for it in items]
+    valid = [it for it, d in zip(items, dates) if it.get("url") and it.get("text") and d]
+    labels = iter(classify_batch([it["text"] for it in valid]))
+    rows = []
+    for it, d in zip(items, dates):
+        if not (it.get("url") and it.get("text") and d):
+            rows.append((None, None, None, None, None, None, None, None, None))
+        else:
+            sig_type, weight, conf = next(labels)
+            text = it["text"]
+            siren, pos = find_siren(text)
+            name = (it.get("company_name") or extract_company_name(text, pos)) if siren else None
+            rows.append((siren, name, sig_type, d, it["url"], text, weight, conf, simhash(text) or 0))
+    return rows
+
+
+def _staging_rows(items: Iterable[dict], batch_size: int = 5000):
+    # Parse à la volée par paquets: classification en un passage par paquet,
+    # sans jamais matérialiser le lot complet en Python
+    ord_ = 0
+    for chunk in _chunks(items, batch_size):
+        for row in prepare_rows(chunk):
+            yield (ord_, *row)
+            ord_ += 1
+
+
+def _chunks(items: Iterable[dict], size: int):
+    chunk = []
+    for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_signals(items: Iterable[dict], source: str = "BODACC") -> dict:
+    """
+    Ingestion ensembliste: COPY des annonces dans une table temporaire,
+    puis résolution des sociétés et upsert des signaux en quelques requêtes.
+    Retourne les compteurs inserted / updated / skipped.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            stats = upsert_staged(cur, _staging_rows(items), source)
+    if stats["inserted"] or stats["updated"]:
+        response_cache.invalidate("signals")
+    return stats
+
+
+def upsert_staged(cur, rows: Iterable[tuple], source: str = "BODACC") -> dict:
+    """
+    Cœur de l'ingestion, dans la transaction du curseur fourni: rows sont des
+    lignes de staging déjà classées (ord, siren, company_name, type, event_date,
+    url, excerpt, weight, confidence, simhash), cf. _staging_rows / prepare_rows.
+    """
+    cur.execute("""
+        create temp table stg_signal (
+          ord int not null,
+          siren text,
+          company_name text,
+          type text,
+          event_date date,
+          url text,
+          excerpt text,
+          weight int,
+          confidence numeric,
+          simhash bigint
+        ) on commit drop;
+    """)
+    names: dict[str, str | None] = {}
+    with cur.copy(
+        "copy stg_signal (ord, siren, company_name, type, event_date, url, excerpt, weight, confidence, simhash) "
+        "from stdin"
+    ) as cp:
+        for row in rows:
+            cp.write_row(row)
+            # SIREN du lot relevés au passage (premier nom trouvé)
+            if row[1] and not names.get(row[1]):
+                names[row[1]] = row[2]
+
+    cur.execute("select count(*), array_agg(distinct date_trunc('month', event_date)::date) from stg_signal;")
+    total, months = cur.fetchone()
+    total = int(total)
+
+    # Un seul lot à la fois: l'unicité par URL passe par le registre signal_url
+    cur.execute("select pg_advisory_xact_lock(hashtext('ingest:signal'));")
+    # Partitions mensuelles manquantes (annonces anciennes ou datées dans le futur)
+    ensure_months_for_dates(cur, months or [])
+
+    # 1) Sociétés: cache SIREN -> id, base seulement pour les SIREN inconnus du cache
+    company_ids, companies_created = resolve_companies(cur, names)
+
+    # 2) Upsert des signaux: dernière occurrence par URL, rien si inchangé.
+    #    Existants retrouvés par signal_url (id + date => une seule partition)
+    cur.execute("""
+        with dedup as (
+          select distinct on (d.url) d.*, c.id as company_id
+            from stg_signal d
+       left join unnest(%s::text[], %s::int[]) as m(siren, company_id) on m.siren = d.siren
+       left join company c on c.id = m.company_id  -- garde-fou: société supprimée depuis la mise en cache
+           where d.url is not null
+           order by d.url, d.ord desc
+        ),
+        existing as (
+          select d.*, u.signal_id, u.event_date as cur_event_date
+            from dedup d
+            join signal_url u on u.url = d.url
+        ),
+        upd as (
+          update signal s
+             set event_date = e.event_date,
+                 excerpt    = e.excerpt,
+                 weight     = e.weight,
+                 confidence = e.confidence,
+                 company_id = coalesce(s.company_id, e.company_id),
+                 type       = e.type,
+                 simhash    = e.simhash
+            from existing e
+           where s.id = e.signal_id and s.event_date = e.cur_event_date
+             and (s.event_date, s.excerpt, s.weight, s.confidence, s.type, s.company_id, s.simhash)
+                 is distinct from
+                 (e.event_date, e.excerpt, e.weight, e.confidence, e.type,
+                  coalesce(s.company_id, e.company_id), e.simhash)
+          returning s.id, s.event_date
+        ),
+        ins as (
+          insert into signal (company_id, source, type, event_date, url, excerpt, weight, confidence, simhash)
+          select d.company_id, %s, d.type, d.event_date, d.url, d.excerpt, d.weight, d.confidence, d.simhash
+            from dedup d
+           where not exists (select 1 from signal_url u where u.url = d.url)
+          returning id, event_date
+        ),
+        touched as (
+          select id, event_date from ins
+          union all
+          select id, event_date from upd
+        )
+        select (select count(*) from ins), (select count(*) from upd),
+               array(select id from touched), array(select event_date from touched);
+    """, (list(company_ids), list(company_ids.values()), source))
+    inserted, updated, ids, dates = cur.fetchone()
+    inserted, updated = int(inserted), int(updated)
+
+    # 3) Quasi-doublons: signaux nouveaux ou modifiés rattachés au plus ancien
+    #    signal équivalent de la société (le scoring ne compte que les canoniques)
+    duplicates = cluster_signals(cur, ids, dates)
+
+    return {
+        "count_source": total,
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": total - inserted - updated,
+        "companies_created": companies_created,
+        "duplicates": duplicates,
+    }
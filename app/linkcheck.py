@@ -0,0 +1,146 @@
+"""
+Vérification asynchrone des liens sources des signaux.
+
+Concurrence bornée globalement et par hôte, connexions réutilisées (un seul
+httpx.AsyncClient), HEAD puis GET "Range: bytes=0-0" si le serveur refuse HEAD.
+Le dernier statut par URL est gardé dans link_status: les liens vérifiés
+récemment ne sont pas re-testés.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.db import connection
+from app.cache import response_cache
+
+LINK_CHECK_CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", "50"))
+LINK_CHECK_PER_HOST = int(os.getenv("LINK_CHECK_PER_HOST", "4"))
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", "5"))
+LINK_CHECK_RECHECK_HOURS = int(os.getenv("LINK_CHECK_RECHECK_HOURS", "24"))
+USER_AGENT = "RadarFR-LinkCheck/1.0"
+
+# Statuts HEAD qui justifient un second essai en GET partiel
+_HEAD_FALLBACK = {403, 405, 501}
+
+
+async def _status(client: httpx.AsyncClient, url: str) -> tuple[int | None, str | None]:
+    try:
+        resp = await client.head(url)
+        if resp.status_code not in _HEAD_FALLBACK:
+            return resp.status_code, None
+        # GET limité au premier octet, corps jamais lu
+        async with client.stream("GET", url, headers={"Range": "bytes=0-0"}) as resp:
+            return resp.status_code, None
+    except httpx.HTTPError as e:
+        return None, type(e).__name__  # échec réseau/timeout
+    except ValueError as e:
+        return None, f"invalid url: {e}"
+
+
+async def check_urls(
+    urls: list[str],
+    concurrency: int = LINK_CHECK_CONCURRENCY,
+    per_host: int = LINK_CHECK_PER_HOST,
+    timeout: float = LINK_CHECK_TIMEOUT,
+) -> dict[str, tuple[int | None, str | None]]:
+    """Retourne {url: (statut HTTP ou None, erreur)}; indépendant de la base."""
+    global_sem = asyncio.Semaphore(concurrency)
+    host_sems: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results: dict[str, tuple[int | None, str | None]] = {}
+
+    async with httpx.AsyncClient(
+        timeout=timeout, limits=limits, follow_redirects=True, headers={"User-Agent": USER_AGENT}
+    ) as client:
+        async def one(url: str):
+            try:
+                host = urlsplit(url).hostname or ""
+            except ValueError:
+                # URL stockée mal formée (ex. "http://[::1"): lien cassé, le run continue
+                results[url] = (None, "invalid url")
+                return
+            # hôte d'abord: une requête en attente sur un hôte saturé ne bloque pas un slot global
+            async with host_sems[host], global_sem:
+                results[url] = await _status(client, url)
+
+        await asyncio.gather(*(one(u) for u in dict.fromkeys(urls)))
+    return results
+
+
+def _due_signals(lookback_days: int, limit: int, recheck_hours: int) -> list[tuple[int, str]]:
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                select s.id, s.url
+                  from signal s
+             left join link_status ls on ls.url = s.url
+                 where s.event_date >= (current_date - %s::int)
+                   and (ls.checked_at is null or ls.checked_at < now() - make_interval(hours => %s))
+                 order by s.event_date desc, s.id desc
+                 limit %s;
+            """, (lookback_days, recheck_hours, limit))
+            return cur.fetchall()
+
+
+def _store_results(items: list[tuple[int, str]], results: dict) -> tuple[int, int]:
+    urls = list(results)
+    statuses = [results[u][0] for u in urls]
+    errors = [results[u][1] for u in urls]
+    broken_ids, broken_notes = [], []
+    for sid, url in items:
+        st, _ = results[url]
+        if st is None or st >= 400:
+            broken_ids.append(sid)
+            broken_notes.append(f"auto(check-links): status={st}")
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                insert into link_status (url, status, error, checked_at)
+                select u, st, err, now()
+                  from unnest(%s::text[], %s::int[], %s::text[]) as t(u, st, err)
+                on conflict (url) do update
+                  set status = excluded.status,
+                      error = excluded.error,
+                      checked_at = excluded.checked_at;
+            """, (urls, statuses, errors))
+            if broken_ids:
+                # upsert par (signal_id, user_id=0) — « système », en une requête
+                cur.execute("""
+                    insert into signal_feedback (signal_id, user_id, label, note)
+                    select sid, 0, 'broken_link', note
+                      from unnest(%s::int[], %s::text[]) as t(sid, note)
+                    on conflict (signal_id, user_id) do update
+                      set label='broken_link',
+                          note=excluded.note,
+                          created_at=now();
+                """, (broken_ids, broken_notes))
+    return len(items) - len(broken_ids), len(broken_ids)
+
+
+async def run_link_check(
+    lookback_days: int = 14,
+    limit: int = 1000,
+    recheck_hours: int = LINK_CHECK_RECHECK_HOURS,
+) -> dict:
+    """Vérifie les liens des signaux récents non vérifiés depuis recheck_hours."""
+    # accès base (psycopg sync) hors de la boucle d'événements
+    items = await asyncio.to_thread(_due_signals, lookback_days, limit, recheck_hours)
+    if not items:
+        return {"scanned": 0, "ok": 0, "broken_tagged": 0}
+    results = await check_urls([url for _, url in items])
+    ok, broken = await asyncio.to_thread(_store_results, items, results)
+    if broken:
+        # invalidate publie un NOTIFY (appel base sync): hors de la boucle
+        await asyncio.to_thread(response_cache.invalidate, "signals")
+    return {"scanned": len(items), "ok": ok, "broken_tagged": broken}
+
+
+if __name__ == "__main__":
+    import sys
+
+    for url, (st, err) in asyncio.run(check_urls(sys.argv[1:])).items():
+        print(f"{st or '-':>4}  {url}  {err or ''}")
@@ -2,7 +2,6 @@ from fastapi import Request, Response
 from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 from fastapi import FastAPI, Query
-from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.encoders import jsonable_encoder
 import os
@@ -10,7 +9,6 @@ import hashlib
 import json as jsonlib
 import json as _json
 from fastapi import HTTPException, Header, Body
-import psycopg
 import datetime as dt
 
 
@@ -63,22 +61,48 @@ def _json_with_etag(payload, request: Request) -> Response:
     if inm == etag:
         return Response(status_code=304, headers=headers, media_type="application/json")
     return Response(content=body, headers=headers, media_type="application/json")
+
+# --- Cache serveur (corps pré-sérialisés + ETag), invalidé par tags à l'écriture ---
+async def _cached_json(request: Request, tags, build, *key_extra, max_age: int = 10, private: bool = False) -> Response:
+    key = cache_key(request.url.path, request.query_params.multi_items(), *key_extra)
+    entry = response_cache.get(key)
+    if entry is None:
+        body = jsonlib.dumps(
+            jsonable_encoder(await build()),
+            separators=(",", ":"), sort_keys=True
+        ).encode("utf-8")
+        entry = response_cache.set(key, body, tags)
+    headers = {"ETag": entry.etag, "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}"}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers, media_type="application/json")
+    return Response(content=entry.body, headers=headers, media_type="application/json")
 from fastapi.responses import HTMLResponse, RedirectResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import re
 
-from app.db import init_db
+from app.db import (
+    init_db, connection as db_connection, open_pool, close_pool, pool_stats,
+    async_connection, open_async_pool, close_async_pool,
+)
 from app.auth import (
-    get_user_by_email, verify_password, create_access_token, decode_token, get_user_by_id
+    create_access_token, decode_token,
+    get_user_by_id_async, auth_cache_stats,
+    get_user_by_email_async, verify_and_update_password, update_password_hash_async, PasswordBusy,
+    email_failures, ip_attempts, login_throttle_stats,
 )
 from app.settings import INTERNAL_TOKEN
-from app.scoring import recompute_daily
+from app.scoring import recompute_daily, recompute_dirty, backfill as score_backfill
 from app.sources.bodacc import collect as bodacc_collect
-
-# app.add_middleware(ETagSignalsMiddleware)  # disabled: called before app init
+from app.ingest import ingest_signals
+from app.rolling import refresh_rolling, ROLLING_WINDOWS
+from app.search import signal_match, signal_rank, document_match
+from app.cache import response_cache, cache_key
+from app.linkcheck import run_link_check, LINK_CHECK_RECHECK_HOURS
+from app.feedback import rebuild_counts, upsert_feedback_batch, feedback_counts
+from app.alerts import match_alerts, run_alerts
+from app.documents import generate_documents, KINDS as DOCUMENT_KINDS, DOCUMENTS_DIR
 
 # Static & templates
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
@@ -96,8 +120,18 @@ def login_page(request: Request):
 def documents_page(request: Request):
     return templates.TemplateResponse("documents.html", {"request": request, "app_name": "Radar FR"})
 
+@app.on_event("startup")
+async def _open_db_pool():
+    open_pool()
+    await open_async_pool()
+
+@app.on_event("shutdown")
+async def _close_db_pool():
+    await close_async_pool()
+    close_pool()
+
 @app.get("/healthz")
-def healthz():
+async def healthz():  # async: jamais bloqué par un threadpool saturé
     return {"ok": True, "env": {"DB_URL_set": bool(os.getenv("DB_URL")), "port": os.getenv("PORT", "8080")}}
 
 @app.post("/admin/init-db")
@@ -105,23 +139,59 @@ def admin_init_db():
     init_db()
     return {"ok": True, "message": "DB initialized"}
 
+@app.get("/admin/db-pool")
+def admin_db_pool(token: str = Query(default="")):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    return {"ok": True, "pool": pool_stats()}
+
+@app.get("/admin/cache")
+def admin_cache(token: str = Query(default=""), flush: bool = Query(default=False)):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    if flush:
+        response_cache.clear()
+    return {"ok": True, "cache": response_cache.stats(), "auth": auth_cache_stats(),
+            "login": login_throttle_stats()}
+
 class LoginBody(BaseModel):
     email: str
     password: str
 
 @app.post("/auth/login")
-def login(body: LoginBody):
-    user = get_user_by_email(body.email.lower())
-    if not user or (not verify_password(body.password, user["password_hash"])):
+async def login(body: LoginBody, request: Request):
+    email = body.email.lower().strip()
+    ip = request.client.host if request.client else "unknown"
+
+    # Limitation avant tout travail bcrypt: échecs par email, tentatives par IP
+    wait = max(email_failures.retry_after(email), ip_attempts.retry_after(ip))
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many login attempts",
+                            headers={"Retry-After": str(wait)})
+    ip_attempts.hit(ip)
+
+    user = await get_user_by_email_async(email)
+    ok, new_hash = False, None
+    if user:
+        try:
+            ok, new_hash = await verify_and_update_password(body.password, user["password_hash"])
+        except PasswordBusy:
+            raise HTTPException(status_code=503, detail="Login temporarily unavailable",
+                                headers={"Retry-After": "1"})
+    if not ok:
+        email_failures.hit(email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    email_failures.reset(email)
+    if new_hash:
+        # coût bcrypt changé: réécriture transparente du hash
+        await update_password_hash_async(user["id"], new_hash)
     token = create_access_token({"sub": str(user["id"]), "client_id": user["client_id"]})
     return {"access_token": token, "token_type": "bearer", "user": {
         "id": user["id"], "client_id": user["client_id"], "full_name": user["full_name"],
         "email": user["email"], "role": user["role"]
     }}
 
-@app.get("/me")
-def me(authorization: str | None = Header(default=None)):
+async def _current_user(authorization: str | None) -> dict:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1]
@@ -130,10 +200,14 @@ def me(authorization: str | None = Header(default=None)):
         user_id = int(data["sub"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = get_user_by_id(user_id)
+    user = await get_user_by_id_async(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"ok": True, "user": user}
+    return user
+
+@app.get("/me")
+async def me(authorization: str | None = Header(default=None)):
+    return {"ok": True, "user": await _current_user(authorization)}
 
 # ----------- ROUTES INTERNES (collector) -----------
 @app.get("/collector/bodacc")
@@ -142,62 +216,15 @@ def collector_bodacc(token: str = Query(default=""), limit: int = Query(default=
         raise HTTPException(status_code=401, detail="Invalid internal token")
     data = bodacc_collect(limit=limit)
     return {"ok": True, "source": "BODACC", "count": len(data), "items": data}
-DB_URL = os.getenv("DB_URL", "postgresql://radar:radarpass@db:5432/radar")
-
 @app.post("/collector/bodacc/ingest")
-def collector_bodacc_ingest(token: str = Query(default=""), limit: int = Query(default=8, ge=1, le=50)):
+def collector_bodacc_ingest(token: str = Query(default=""), limit: int = Query(default=8, ge=1, le=100_000)):
     if token != INTERNAL_TOKEN:
         raise HTTPException(status_code=401, detail="Invalid internal token")
 
+    # Lot ensembliste: COPY -> table de staging -> upserts (cf. app/ingest.py)
     items = bodacc_collect(limit=limit)
-    inserted = 0
-    with psycopg.connect(DB_URL, autocommit=True) as conn:
-        with conn.cursor() as cur:
-            for it in items:
-                # 1) Extraire SIREN s'il est présent
-                m = re.search(r"(SIREN\s+)?(\d{9})", it["text"])
-                siren = m.group(2) if m else None
-
-                # 2) Upsert company (si SIREN détecté)
-                company_id = None
-                if siren:
-                    cur.execute("""
-                        insert into company (country, siren, name)
-                        values ('FR', %s, coalesce(%s,'Inconnue'))
-                        on conflict (siren) do update set updated_at=now()
-                        returning id;
-                    """, (siren, None))
-                    row = cur.fetchone()
-                    company_id = row[0] if row else None
-
-                # 3) Classifier le type de signal (MVP)
-                txt = it["text"].lower()
-                if "redressement judiciaire" in txt or "liquidation judiciaire" in txt:
-                    sig_type = "PROC_COLLECTIVE"; weight = 100; conf = 0.95
-                elif "cession de fonds" in txt:
-                    sig_type = "SALE_OF_BUSINESS"; weight = 70; conf = 0.80
-                elif "fusion" in txt:
-                    sig_type = "M&A_PROJECT"; weight = 60; conf = 0.70
-                else:
-                    sig_type = "OTHER"; weight = 30; conf = 0.50
-
-                # 4) Insérer le signal (éviter doublons par URL)
-                cur.execute("""
-   	 		insert into signal (company_id, source, type, event_date, url, excerpt, weight, confidence)
-    			values (%s, 'BODACC', %s, %s, %s, %s, %s, %s)
-    			on conflict (url) do update
-      				set event_date = excluded.event_date,
-          				excerpt    = excluded.excerpt,
-          				weight     = excluded.weight,
-          				confidence = excluded.confidence,
-          				company_id = coalesce(signal.company_id, excluded.company_id),
-          				type       = excluded.type;
-		""", (
-   	 		company_id, sig_type, it["event_date"],
-    			it["url"], it["text"], weight, conf
-		))
-
-    return {"ok": True, "inserted": inserted, "count_source": len(items)}
+    stats = ingest_signals(items, source="BODACC")
+    return {"ok": True, **stats}
 from typing import Optional, List, Dict
 
 @app.post("/admin/score-daily")
@@ -213,8 +240,75 @@ def admin_score_daily(token: str = Query(default=""), date: str | None = Query(d
     n = recompute_daily(date)
     return {"ok": True, "updated_rows": n, "date": date}
 
+@app.post("/admin/score-dirty")
+def admin_score_dirty(token: str = Query(default=""), batch_size: int = Query(default=5000, ge=1, le=100_000)):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    stats = recompute_dirty(batch_size=batch_size)
+    return {"ok": True, **stats}
+
+@app.post("/admin/alerts")
+def admin_alerts(token: str = Query(default=""), date: str | None = Query(default=None), notify: bool = Query(default=False)):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    try:
+        if date:
+            dt.date.fromisoformat(date)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
+    stats = run_alerts(date) if notify else match_alerts(date)
+    return {"ok": True, "date": date, **stats}
+
+@app.post("/admin/documents")
+def admin_documents(
+    token: str = Query(default=""),
+    kind: str = Query(default="daily_brief"),
+    date: str | None = Query(default=None),
+    force: bool = Query(default=False),
+):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    if kind not in DOCUMENT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(DOCUMENT_KINDS)}")
+    try:
+        if date:
+            dt.date.fromisoformat(date)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
+    return {"ok": True, **generate_documents(kind, date, force=force)}
+
+@app.post("/admin/feedback-counts")
+def admin_feedback_counts(token: str = Query(default=""), dry_run: bool = Query(default=True)):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    stats = rebuild_counts(dry_run=dry_run)
+    if stats["fixed"]:
+        response_cache.invalidate("signals")
+    return {"ok": True, **stats}
+
+@app.post("/admin/score-backfill")
+def admin_score_backfill(
+    token: str = Query(default=""),
+    date_from: str = Query(...),
+    date_to: str = Query(...),
+    chunk_days: int = Query(default=7, ge=1, le=366),
+    parallelism: int = Query(default=4, ge=1, le=32),
+    restart: bool = Query(default=False),
+):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    try:
+        d0 = dt.date.fromisoformat(date_from)
+        d1 = dt.date.fromisoformat(date_to)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
+    if d1 < d0:
+        raise HTTPException(status_code=400, detail="date_to must be >= date_from")
+    res = score_backfill(d0, d1, chunk_days=chunk_days, parallelism=parallelism, restart=restart)
+    return {"ok": True, **res}
+
 @app.get("/api/scores/daily")
-def api_scores_daily(date: Optional[str] = None, limit: int = Query(default=50, ge=1, le=200)):
+async def api_scores_daily(request: Request, date: Optional[str] = None, limit: int = Query(default=50, ge=1, le=200)):
     """
     Retourne les sociétés scorées pour une date (YYYY-MM-DD).
     Par défaut: aujourd'hui.
@@ -233,10 +327,14 @@ def api_scores_daily(date: Optional[str] = None, limit: int = Query(default=50,
     except Exception:
         raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
 
+    return await _cached_json(request, ("scores", f"scores:{date_str}"),
+                        lambda: _scores_daily_payload(date_str, limit), date_str)
+
+async def _scores_daily_payload(date_str: str, limit: int) -> dict:
     rows: List[Dict] = []
-    with psycopg.connect(DB_URL) as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                 select
                   cs.company_id,
                   coalesce(c.name, 'Inconnue') as company_name,
@@ -250,7 +348,7 @@ def api_scores_daily(date: Optional[str] = None, limit: int = Query(default=50,
                 order by cs.score_total desc
                 limit %s;
             """, (date_str, limit))
-            for (company_id, company_name, siren, score_date, score_total, top_signal_type) in cur.fetchall():
+            for (company_id, company_name, siren, score_date, score_total, top_signal_type) in await cur.fetchall():
                 rows.append({
                     "company_id": company_id,
                     "company_name": company_name,
@@ -261,9 +359,60 @@ def api_scores_daily(date: Optional[str] = None, limit: int = Query(default=50,
                 })
     return {"ok": True, "date": date_str, "count": len(rows), "items": rows}
 @app.get("/api/scores/latest")
-def api_scores_latest(limit: int = Query(default=50, ge=1, le=200)):
+async def api_scores_latest(request: Request, limit: int = Query(default=50, ge=1, le=200)):
     today = dt.date.today().isoformat()
-    return api_scores_daily(date=today, limit=limit)
+    return await _cached_json(request, ("scores", f"scores:{today}"),
+                        lambda: _scores_daily_payload(today, limit), today)
+
+@app.get("/api/scores/rolling")
+async def api_scores_rolling(request: Request, window: int = Query(default=30), limit: int = Query(default=50, ge=1, le=200)):
+    """
+    Top-N des sociétés par score glissant décroissant (fenêtre 30 ou 90 jours).
+    Lit uniquement la table matérialisée company_score_rolling.
+    """
+    if window not in ROLLING_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Unknown window, expected one of {list(ROLLING_WINDOWS)}")
+    return await _cached_json(request, ("rolling",), lambda: _scores_rolling_payload(window, limit))
+
+async def _scores_rolling_payload(window: int, limit: int) -> dict:
+    rows: List[Dict] = []
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                select
+                  r.company_id,
+                  coalesce(c.name, 'Inconnue') as company_name,
+                  c.siren,
+                  r.as_of,
+                  r.score,
+                  r.top_signal_type
+                from company_score_rolling r
+                left join company c on c.id = r.company_id
+                where r.window_days = %s
+                order by r.score desc
+                limit %s;
+            """, (window, limit))
+            for (company_id, company_name, siren, as_of, score, top_signal_type) in await cur.fetchall():
+                rows.append({
+                    "company_id": company_id,
+                    "company_name": company_name,
+                    "siren": siren,
+                    "as_of": as_of.isoformat(),
+                    "score": round(float(score), 2),
+                    "top_signal_type": top_signal_type,
+                })
+    return {"ok": True, "window": window, "count": len(rows), "items": rows}
+
+@app.post("/admin/score-rolling")
+def admin_score_rolling(token: str = Query(default=""), date: str | None = Query(default=None), rebuild: bool = Query(default=False)):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    try:
+        if date:
+            dt.date.fromisoformat(date)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
+    return {"ok": True, "windows": refresh_rolling(date, rebuild=rebuild)}
 # --- FEEDBACK ANALYSTE SUR LES SIGNAUX ---
 from typing import Literal
 
@@ -299,7 +448,7 @@ def create_or_update_signal_feedback(
     if len(note) > 2000:
         note = note[:2000]
 
-    with psycopg.connect(DB_URL, autocommit=True) as conn:
+    with db_connection() as conn:
         with conn.cursor() as cur:
             # 404 si le signal n'existe pas
             cur.execute("select 1 from signal where id = %s;", (signal_id,))
@@ -318,25 +467,56 @@ def create_or_update_signal_feedback(
             """, (signal_id, user_id, label, note))
             row = cur.fetchone()
 
+    response_cache.invalidate("signals")
     return {"ok": True, "item": {
         "id": row[0], "signal_id": row[1], "user_id": row[2],
         "label": row[3], "note": row[4], "created_at": row[5].isoformat()
     }}
 
+class FeedbackBatchItem(BaseModel):
+    signal_id: int
+    label: str  # validé par entrée, pour un résultat par ligne plutôt qu'un 422 global
+    note: str | None = None
+
+class FeedbackBatchBody(BaseModel):
+    items: list[FeedbackBatchItem] = Field(..., min_length=1, max_length=1000)
+
+@app.post("/api/signals/feedback/batch")
+def create_or_update_signal_feedback_batch(
+    body: FeedbackBatchBody = Body(...),
+    authorization: str | None = Header(default=None),
+):
+    user_id = _require_user_id(authorization)
+    results = upsert_feedback_batch(user_id, [it.model_dump() for it in body.items])
+    saved = sum(1 for r in results if r["status"] == "ok")
+    if saved:
+        response_cache.invalidate("signals")
+    return {"ok": True, "saved": saved, "results": results}
+
+@app.get("/api/signals/feedback/counts")
+async def get_signal_feedback_counts(ids: str = Query(..., description="IDs de signaux séparés par des virgules")):
+    try:
+        signal_ids = list(dict.fromkeys(int(x) for x in ids.split(",") if x.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if len(signal_ids) > 1000:
+        raise HTTPException(status_code=400, detail="Too many ids (max 1000)")
+    counts = await feedback_counts(signal_ids)
+    return {"ok": True, "counts": {str(k): v for k, v in counts.items()}}
+
 @app.get("/api/signals/{signal_id}/feedback")
-def get_signal_feedback(signal_id: int, limit: int = Query(default=10, ge=1, le=50)):
-    with psycopg.connect(DB_URL) as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                select label, count(*) as n
-                from signal_feedback
-                where signal_id = %s
-                group by label
+async def get_signal_feedback(signal_id: int, limit: int = Query(default=10, ge=1, le=50)):
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                select label, n
+                from signal_feedback_count
+                where signal_id = %s and n > 0
                 order by label;
             """, (signal_id,))
-            counts = [{"label": r[0], "count": int(r[1])} for r in cur.fetchall()]
+            counts = [{"label": r[0], "count": int(r[1])} for r in await cur.fetchall()]
 
-            cur.execute("""
+            await cur.execute("""
                 select sf.label, sf.note, sf.user_id, sf.created_at
                 from signal_feedback sf
                 where sf.signal_id = %s
@@ -348,7 +528,7 @@ def get_signal_feedback(signal_id: int, limit: int = Query(default=10, ge=1, le=
                 "note": r[1],
                 "user_id": r[2],
                 "created_at": r[3].isoformat(),
-            } for r in cur.fetchall()]
+            } for r in await cur.fetchall()]
 
     return {"ok": True, "signal_id": signal_id, "counts": counts, "latest": latest}
 @app.post("/auth/dev-login")
@@ -363,7 +543,7 @@ def dev_login(token: str = Query(default=""), user_id: int = Query(default=1)):
 from fastapi.responses import HTMLResponse
 
 @app.get("/signals", response_class=HTMLResponse)
-def signals_page(
+async def signals_page(
     request: Request,
     limit: int = Query(default=20, ge=1, le=200),
     q: str | None = Query(default=None),
@@ -371,15 +551,21 @@ def signals_page(
     label: str | None = Query(default=None),
     date_from: str | None = Query(default=None),
     date_to: str | None = Query(default=None),
+    sort: str | None = Query(default=None),
 ):
     # Build filtres
     where = ["1=1"]
     params: list = []
+    order_sql, order_params = "s.event_date desc, s.id desc", []
 
     if q and q.strip():
-        where.append("(s.excerpt ILIKE %s OR c.name ILIKE %s OR c.siren ILIKE %s)")
-        v = f"%{q.strip()}%"
-        params += [v, v, v]
+        # plein texte sur l'extrait + trigrammes sur nom / SIREN partiel
+        match_sql, match_params = signal_match(q, include_company=True)
+        where.append(match_sql)
+        params += match_params
+        if sort != "date":
+            rank_sql, order_params = signal_rank(q)
+            order_sql = f"{rank_sql} desc, s.event_date desc, s.id desc"
 
     if sig_type and sig_type.strip():
         where.append("s.type = %s")
@@ -395,8 +581,8 @@ def signals_page(
 
     if label and label.strip():
         where.append(
-            "EXISTS (select 1 from signal_feedback sf "
-            "where sf.signal_id = s.id and sf.label = %s)"
+            "EXISTS (select 1 from signal_feedback_count fc "
+            "where fc.signal_id = s.id and fc.label = %s and fc.n > 0)"
         )
         params.append(label.strip())
 
@@ -404,9 +590,9 @@ def signals_page(
 
     # Derniers signaux
     rows: list[dict] = []
-    with psycopg.connect(DB_URL) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 f"""
                 select s.id,
                        coalesce(c.name,'Inconnue') as company_name,
@@ -420,31 +606,28 @@ def signals_page(
                   from signal s
              left join company c on c.id = s.company_id
                  where {where_sql}
-              order by s.event_date desc, s.id desc
+              order by {order_sql}
                  limit %s;
                 """,
-                (*params, limit),
+                (*params, *order_params, limit),
             )
             cols = [d[0] for d in cur.description]
-            for r in cur.fetchall():
+            for r in await cur.fetchall():
                 rows.append(dict(zip(cols, r)))
 
-    # Feedback counts pour ces signaux
-    counts: dict[int, dict[str, int]] = {}
-    if rows:
-        ids = [r["id"] for r in rows]
-        with psycopg.connect(DB_URL) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
+            # Feedback counts pour ces signaux (même connexion)
+            counts: dict[int, dict[str, int]] = {}
+            if rows:
+                ids = [r["id"] for r in rows]
+                await cur.execute(
                     """
-                    select signal_id, label, count(*) as n
-                      from signal_feedback
-                     where signal_id = ANY(%s)
-                     group by signal_id, label;
+                    select signal_id, label, n
+                      from signal_feedback_count
+                     where signal_id = ANY(%s) and n > 0;
                     """,
                     (ids,),
                 )
-                for sid, lbl, n in cur.fetchall():
+                for sid, lbl, n in await cur.fetchall():
                     counts.setdefault(sid, {})[lbl] = int(n)
 
     return templates.TemplateResponse(
@@ -466,130 +649,71 @@ def signals_page(
 
 
 # --- INTERNAL: check source links and tag broken_link ---
-import urllib.request
-import urllib.error
-import socket
-from app.scheduler import start_jobs  # ensured by patch
+from app.scheduler import start_jobs, stop_jobs, recent_runs, scheduler_status  # ensured by patch
+from app.cluster import start_cache_sync
 
 @app.on_event("startup")
 async def _start_jobs():
+    start_cache_sync()
     start_jobs(app)
 
-def internal_check_links(
+@app.on_event("shutdown")
+def _stop_jobs():
+    stop_jobs(app)
+
+@app.get("/admin/scheduler")
+def admin_scheduler(token: str = Query(default="")):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    return {"ok": True, **scheduler_status(app)}
+
+@app.get("/admin/jobs/runs")
+def admin_job_runs(
     token: str = Query(default=""),
-    lookback_days: int = Query(default=14, ge=1, le=90),
-    limit: int = Query(default=200, ge=1, le=1000),
+    job_id: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
 ):
     if token != INTERNAL_TOKEN:
         raise HTTPException(status_code=401, detail="Invalid internal token")
+    runs = recent_runs(job_id=job_id, limit=limit)
+    return {"ok": True, "count": len(runs), "items": jsonable_encoder(runs)}
 
-    # 1) Récupère des signaux récents
-    items = []
-    with psycopg.connect(DB_URL) as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                select id, url
-                  from signal
-                 where event_date >= (current_date - %s::int)
-                 order by event_date desc, id desc
-                 limit %s;
-            """, (lookback_days, limit))
-            items = cur.fetchall()
-    def head_status(url: str, timeout: float = 5.0) -> int | None:
-        try:
-            req = urllib.request.Request(url, method="HEAD")
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                return getattr(resp, "status", 200)
-        except urllib.error.HTTPError as e:
-            # si 403/405 sur HEAD, tente un GET léger
-            if e.code in (403,405):
-                try:
-                    req = urllib.request.Request(url, method="GET")
-                    # ne télécharge pas tout : on s'arrête dès l'entête
-                    with urllib.request.urlopen(req, timeout=timeout) as resp:
-                        return getattr(resp, "status", 200)
-                except Exception:
-                    pass
-            return e.code
-        except (urllib.error.URLError, socket.timeout, ValueError):
-            return None  # échec réseau/timeout/URL invalide
-
-    broken, ok = 0, 0
-    with psycopg.connect(DB_URL, autocommit=True) as conn:
-        with conn.cursor() as cur:
-            for sid, url in items:
-                st = head_status(url)
-                is_broken = (st is None) or (st >= 400)
-                if is_broken:
-                    broken += 1
-                    # upsert par (signal_id, user_id=0) — « système »
-                    cur.execute("""
-                        insert into signal_feedback (signal_id, user_id, label, note)
-                        values (%s, 0, 'broken_link', %s)
-                        on conflict (signal_id, user_id) do update
-                          set label='broken_link',
-                              note=excluded.note,
-                              created_at=now();
-                    """, (sid, f"auto(check-links): status={st}"))
-                else:
-                    ok += 1
-
-    return {"ok": True, "scanned": len(items), "ok": ok, "broken_tagged": broken}
+@app.post("/internal/check-links")
+async def internal_check_links(
+    token: str = Query(default=""),
+    lookback_days: int = Query(default=14, ge=1, le=90),
+    limit: int = Query(default=1000, ge=1, le=20_000),
+    recheck_hours: int = Query(default=LINK_CHECK_RECHECK_HOURS, ge=0, le=24 * 30),
+):
+    if token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+    stats = await run_link_check(lookback_days=lookback_days, limit=limit, recheck_hours=recheck_hours)
+    return {"ok": True, **stats}
 
 # --- pagination helpers ---
-def _encode_cursor(d, i):  # d: date, i: id
-    return f"{d}|{i}"
+# Curseur keyset sur (event_date, id): "n|date|id" = page suivante, "p|date|id" = précédente
+def _encode_cursor(d, i, direction: str = "n"):  # d: date, i: id
+    return f"{direction}|{d}|{i}"
 
 def _decode_cursor(c):
     try:
-        d, i = c.split("|", 1)
-        return d[:10], int(i)
+        parts = c.split("|")
+        direction = parts.pop(0) if len(parts) == 3 else "n"
+        if direction not in ("n", "p"):
+            raise ValueError(direction)
+        d, i = parts
+        dt.date.fromisoformat(d[:10])
+        return direction, d[:10], int(i)
     except Exception:
         raise HTTPException(status_code=400, detail="Bad cursor")
 
-class ETagSignalsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-
-        try:
-            # Ne gère que GET /api/signals*
-            if request.method != "GET":
-                return response
-            path = request.url.path
-            if not path.startswith("/api/signals"):
-                return response
-
-            # Reconstitue le body (il faut le lire pour hasher)
-            body = b""
-            async for chunk in response.body_iterator:
-                body += chunk
-
-            etag = hashlib.sha1(body).hexdigest()
-            inm = request.headers.get("if-none-match")
-
-            from starlette.responses import Response as _StarResp
-
-            # 304 si identique
-            if inm == etag:
-                r = _StarResp(status_code=304)
-                r.headers["ETag"] = etag
-                r.headers["Cache-Control"] = "public, max-age=15"
-#                 return r  # neutralisé: hors fonction
-
-            # Sinon on renvoie le même contenu + headers cache
-            r = _StarResp(
-                content=body,
-                status_code=response.status_code,
-                media_type=response.media_type,
-                headers=dict(response.headers),
-            )
-            r.headers["ETag"] = etag
-            r.headers["Cache-Control"] = "public, max-age=15"
-#             return r  # neutralisé: hors fonction
-        except Exception:
-            # En cas de pépin, on renvoie la réponse originale
-            return response
-
+async def _estimate_count(cur, from_where_sql: str, params: list) -> int:
+    # Estimation du planner (EXPLAIN, sans exécution): coût constant quel que soit le volume
+    await cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where_sql}", params)
+    plan = (await cur.fetchone())[0]
+    if isinstance(plan, str):
+        plan = _json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 # --- Minimal health endpoint (added by script) ---
 @app.get("/health")
@@ -609,76 +733,349 @@ def signals_head() -> Response:
         "Content-Type": "application/json"
     })
 @app.get("/api/signals", response_model=None)
-def api_signals(
+async def api_signals(
     request: Request,
-    response: Response,
-    q: str = Query("", max_length=200, description="Recherche sur excerpt (ILIKE)"),
+    q: str = Query("", max_length=200, description="Recherche plein texte (français) sur excerpt"),
     sig_type: str | None = Query(None, description="Filtre sur type"),
     label: str | None = Query(None, description="Filtre sur label de feedback"),
+    sort: Literal["date", "relevance"] | None = Query(None, description="Tri; défaut: relevance si q, sinon date"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Curseur keyset (next_cursor / prev_cursor), tri date"),
+    offset: int = Query(0, ge=0, description="Pagination par offset (tri relevance)"),
+    total: Literal["estimate", "exact", "none"] = Query("estimate", description="Calcul du total"),
 ):
+    return await _cached_json(
+        request, ("signals",),
+        lambda: _signals_payload(q, sig_type, label, sort, limit, cursor, offset, total),
+    )
+
+async def _signals_payload(q, sig_type, label, sort, limit, cursor, offset, total) -> dict:
     where = []
     params = []
 
+    q = q.strip()
+    ranked = bool(q) and sort != "date"
+    order_params: list = []
     if q:
-        where.append("s.excerpt ILIKE %s")
-        params.append(f"%{q}%")
+        match_sql, match_params = signal_match(q)
+        where.append(match_sql)
+        params += match_params
+        if ranked:
+            rank_sql, order_params = signal_rank(q)
 
     if sig_type:
         where.append("s.type = %s")
         params.append(sig_type)
 
     if label:
-        where.append("EXISTS (SELECT 1 FROM signal_feedback f WHERE f.signal_id = s.id AND f.label = %s)")
+        where.append("EXISTS (SELECT 1 FROM signal_feedback_count f WHERE f.signal_id = s.id AND f.label = %s AND f.n > 0)")
         params.append(label)
 
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-    DB_URL = os.getenv("DB_URL", "postgresql://radar:radarpass@db:5432/radar")
-    with psycopg.connect(DB_URL, autocommit=True) as conn:
-        with conn.cursor() as cur:
-            # total pour pagination
-            cur.execute(f"SELECT count(1) FROM signal s {where_sql};", params)
-            total = int(cur.fetchone()[0])
+    # Keyset sur (event_date, id), servi par idx_signal_date_id: la page N coûte comme la page 1
+    direction = "n"
+    page_where, page_params = list(where), list(params)
+    if cursor and not ranked:
+        direction, c_date, c_id = _decode_cursor(cursor)
+        op = "<" if direction == "n" else ">"
+        page_where.append(f"(s.event_date, s.id) {op} (%s::date, %s)")
+        page_params += [c_date, c_id]
+
+    if ranked:
+        order_sql = f"{rank_sql} DESC, s.event_date DESC, s.id DESC"
+    elif direction == "p":
+        # page précédente: on remonte en ordre croissant puis on réinverse
+        order_sql = "s.event_date ASC, s.id ASC"
+    else:
+        order_sql = "s.event_date DESC, s.id DESC"
 
-            # page
-            cur.execute(
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    page_where_sql = ("WHERE " + " AND ".join(page_where)) if page_where else ""
+    use_offset = ranked or bool(offset and not cursor)
+
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            total_n = None
+            if total == "exact":
+                await cur.execute(f"SELECT count(1) FROM signal s {where_sql};", params)
+                total_n = int((await cur.fetchone())[0])
+            elif total == "estimate":
+                total_n = await _estimate_count(cur, f"FROM signal s {where_sql}", params)
+
+            # page (+1 ligne pour savoir s'il y a une suite)
+            await cur.execute(
                 f"""
                 SELECT s.id, s.type, s.event_date::text AS event_date, s.url, s.excerpt
                 FROM signal s
-                {where_sql}
-                ORDER BY s.event_date DESC, s.id DESC
-                LIMIT %s OFFSET %s
+                {page_where_sql}
+                ORDER BY {order_sql}
+                LIMIT %s {"OFFSET %s" if use_offset else ""}
                 """,
-                params + [limit, offset],
+                page_params + order_params + [limit + 1] + ([offset] if use_offset else []),
             )
             cols = [c[0] for c in cur.description]
-            items = [dict(zip(cols, row)) for row in cur.fetchall()]
+            items = [dict(zip(cols, row)) for row in await cur.fetchall()]
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == "p":
+        items.reverse()
 
     payload = {
         "ok": True,
-        "total": total,
+        "total": total_n,
+        "total_is_estimate": total == "estimate" and total_n is not None,
         "limit": limit,
-        "offset": offset,
-        "next_offset": (offset + limit) if (offset + limit) < total else None,
-        "prev_offset": (offset - limit) if (offset - limit) >= 0 else None,
         "items": items,
     }
-    headers = {"Cache-Control": "public, max-age=10"}
-    response.headers.update(headers)
-    return _json_with_cache(payload, headers=headers)
+    if use_offset:
+        payload.update({
+            "offset": offset,
+            "next_offset": (offset + limit) if has_more else None,
+            "prev_offset": max(offset - limit, 0) if offset > 0 else None,
+        })
+    else:
+        first, last = (items[0], items[-1]) if items else (None, None)
+        # en remontant (p), "has_more" concerne les pages plus récentes
+        more_next = has_more if direction == "n" else bool(cursor)
+        more_prev = bool(cursor) if direction == "n" else has_more
+        payload.update({
+            "next_cursor": _encode_cursor(last["event_date"], last["id"], "n") if last and more_next else None,
+            "prev_cursor": _encode_cursor(first["event_date"], first["id"], "p") if first and more_prev else None,
+        })
+    return payload
+
+
+# --- EXPORTS (flux NDJSON / CSV) ---
+from fastapi.responses import StreamingResponse
+from app.export import stream_export, signals_query, scores_query, SIGNAL_COLUMNS, SCORE_COLUMNS
+
+_EXPORT_MEDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+def _check_dates(*dates):
+    for d in dates:
+        if d:
+            try:
+                dt.date.fromisoformat(d)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Bad date format, expected YYYY-MM-DD")
+
+def _export_response(name: str, sql: str, params: list, columns: list[str], fmt: str, gzip: bool):
+    filename = f"{name}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(sql, params, columns, fmt=fmt, gzip=gzip),
+        media_type="application/gzip" if gzip else _EXPORT_MEDIA[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+@app.get("/api/export/signals")
+async def export_signals(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Fichier compressé (.gz)"),
+    date_from: str | None = Query(None),
+    date_to: str | None = Query(None),
+    sig_type: str | None = Query(None),
+    label: str | None = Query(None, description="Filtre sur label de feedback"),
+):
+    _check_dates(date_from, date_to)
+    sql, params = signals_query(date_from, date_to, sig_type, label)
+    return _export_response("signals", sql, params, SIGNAL_COLUMNS, format, gzip)
+
+@app.get("/api/export/scores")
+async def export_scores(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Fichier compressé (.gz)"),
+    date_from: str | None = Query(None),
+    date_to: str | None = Query(None),
+    sig_type: str | None = Query(None, description="Filtre sur le type dominant"),
+    min_score: float | None = Query(None),
+):
+    _check_dates(date_from, date_to)
+    sql, params = scores_query(date_from, date_to, sig_type, min_score)
+    return _export_response("scores", sql, params, SCORE_COLUMNS, format, gzip)
+
 
+# --- DOCUMENTS (briefs / digests PDF du client connecté) ---
+DOCUMENT_CHUNK_BYTES = 64 * 1024
 
-# --- Cache-Control pour /api/signals (GET & HEAD) ---
+def _encode_doc_cursor(published_at, i):
+    # UTC avec "Z": pas de "+" à échapper dans l'URL
+    return f"{published_at.astimezone(dt.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')}|{i}"
 
-# --- Cache-Control pour /api/signals (GET, HEAD, OPTIONS) --- (version robuste)
+def _decode_doc_cursor(c):
+    try:
+        ts, i = c.rsplit("|", 1)
+        return dt.datetime.fromisoformat(ts), int(i)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad cursor")
 
+@app.get("/api/documents")
+async def api_documents(
+    request: Request,
+    authorization: str | None = Header(default=None),
+    kind: Literal["daily_brief", "weekly_digest"] | None = Query(None),
+    sector: str | None = Query(None, description="Filtre sur sector_tag (préfixe NAF)"),
+    sig_type: str | None = Query(None, description="Filtre sur le type de signal dominant"),
+    week: str | None = Query(None, pattern=r"^\d{4}-W\d{2}$", description="Semaine ISO, ex. 2026-W42"),
+    min_score: float | None = Query(None),
+    q: str = Query("", max_length=200, description="Recherche plein texte sur le titre"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="Curseur keyset (next_cursor)"),
+    facets: bool = Query(True, description="Inclure les compteurs par secteur / type / semaine"),
+):
+    user = await _current_user(authorization)
+    client_id = user["client_id"]
+    return await _cached_json(
+        request, ("documents",),
+        lambda: _documents_payload(client_id, kind, sector, sig_type, week, min_score, q, limit, cursor, facets),
+        client_id, private=True,
+    )
+
+async def _documents_payload(client_id, kind, sector, sig_type, week, min_score, q, limit, cursor, facets) -> dict:
+    # Toujours client_id en tête: index (client_id, kind, published_at), (client_id, sector_tag),
+    # (client_id, week_label), (client_id, published_at desc, id desc), GIN sur le titre
+    where, params = ["d.client_id = %s"], [client_id]
+    if kind:
+        where.append("d.kind = %s")
+        params.append(kind)
+    if sector:
+        where.append("d.sector_tag = %s")
+        params.append(sector)
+    if sig_type:
+        where.append("d.top_signal_type = %s")
+        params.append(sig_type)
+    if week:
+        where.append("d.week_label = %s")
+        params.append(week)
+    if min_score is not None:
+        where.append("d.score >= %s")
+        params.append(min_score)
+    if q.strip():
+        match_sql, match_params = document_match(q)
+        where.append(match_sql)
+        params += match_params
+    if cursor:
+        c_ts, c_id = _decode_doc_cursor(cursor)
+        where.append("(d.published_at, d.id) < (%s, %s)")
+        params += [c_ts, c_id]
+
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"""
+                SELECT d.id, d.kind, d.title, d.published_at, d.period_start, d.week_label,
+                       d.score, d.top_signal_type, d.sector_tag, d.company_id, d.size_bytes
+                FROM document_pdf d
+                WHERE {" AND ".join(where)}
+                ORDER BY d.published_at DESC, d.id DESC
+                LIMIT %s
+                """,
+                params + [limit + 1],
+            )
+            cols = [c[0] for c in cur.description]
+            items = [dict(zip(cols, row)) for row in await cur.fetchall()]
+            facet_counts = None
+            if facets:
+                # résumé précalculé (trigger sur document_pdf), jamais de group by ici
+                await cur.execute(
+                    """
+                    SELECT facet, value, n FROM document_facet
+                    WHERE client_id = %s AND n > 0
+                    ORDER BY facet, n DESC, value DESC
+                    """,
+                    (client_id,),
+                )
+                facet_counts = {"sector": [], "type": [], "week": [], "kind": []}
+                for facet, value, n in await cur.fetchall():
+                    facet_counts.setdefault(facet, []).append({"value": value, "count": n})
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    for it in items:
+        it["download_url"] = f"/api/documents/{it['id']}/file"
+    last = items[-1] if items else None
+    return {
+        "ok": True,
+        "limit": limit,
+        "items": items,
+        "next_cursor": _encode_doc_cursor(last["published_at"], last["id"]) if last and has_more else None,
+        "facets": facet_counts,
+    }
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Intervalle unique "bytes=a-b" / "bytes=a-" / "bytes=-n"; None = réponse complète."""
+    m = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not m or not (m[1] or m[2]):
+        return None  # syntaxe inconnue ou multi-intervalles: ignoré (RFC 9110)
+    if m[1]:
+        start = int(m[1])
+        end = int(m[2]) if m[2] else size - 1
+        if m[2] and end < start:
+            return None  # intervalle invalide: ignoré
+    else:
+        # suffixe: les n derniers octets ("bytes=-0" n'en désigne aucun)
+        start, end = (max(size - int(m[2]), 0) if int(m[2]) else size), size - 1
+    if start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+def _file_chunks(path: Path, start: int, end: int):
+    # générateur synchrone: itéré par Starlette dans le threadpool
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(DOCUMENT_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+@app.get("/api/documents/{doc_id}/file")
+async def api_document_file(
+    doc_id: int,
+    request: Request,
+    authorization: str | None = Header(default=None),
+):
+    user = await _current_user(authorization)
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT path, content_hash FROM document_pdf WHERE id = %s AND client_id = %s",
+                (doc_id, user["client_id"]),
+            )
+            row = await cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Document not found")
+    root = DOCUMENTS_DIR.resolve()
+    path = (root / row[0]).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    size = path.stat().st_size
+    etag = f'"{row[1] or size}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=300",
+        "Content-Disposition": f'inline; filename="{path.name}"',
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    rng = None
+    range_header = request.headers.get("range")
+    # If-Range: l'intervalle ne vaut que si le client a encore la même version
+    if range_header and request.headers.get("if-range", etag) == etag:
+        rng = _parse_range(range_header, size)
+    start, end = rng or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if rng:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        _file_chunks(path, start, end),
+        status_code=206 if rng else 200,
+        media_type="application/pdf",
+        headers=headers,
+    )
 
-# --- Tiny helper to attach Cache-Control on JSON payloads (no middleware) ---
-def _json_with_cache(payload, max_age: int = 10, headers: dict | None = None):
-    """Wrap JSONResponse with Cache-Control and optional extra headers."""
-    base_headers = {"Cache-Control": f"public, max-age={max_age}"}
-    if headers:
-        base_headers.update(headers)
-    return JSONResponse(payload, headers=base_headers)
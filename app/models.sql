@@ -173,3 +173,442 @@ create table if not exists document_pdf (
 create index if not exists idx_docpdf_client_kind_date on document_pdf (client_id, kind, published_at);
 create index if not exists idx_docpdf_client_sector on document_pdf (client_id, sector_tag);
 create index if not exists idx_docpdf_client_week on document_pdf (client_id, week_label);
+
+-- Unicité des signaux par URL: signal étant partitionné par mois (app/partitions.py),
+-- un index unique sur url seul est impossible; signal_url sert de registre global
+-- (url -> id, event_date), tenu par triggers et lu par l'ingestion.
+create table if not exists signal_url (
+  url text primary key,
+  signal_id int not null,
+  event_date date not null
+);
+create index if not exists idx_signal_url_signal on signal_url (signal_id);
+
+-- Feedback analystes sur les signaux (user_id = 0: système, ex. check-links)
+create table if not exists signal_feedback (
+  id serial primary key,
+  signal_id int not null references signal(id) on delete cascade,
+  user_id int not null,
+  label text not null, -- 'reliable' | 'unclear' | 'broken_link' | 'false_positive'
+  note text,
+  created_at timestamptz default now(),
+  unique (signal_id, user_id)
+);
+create index if not exists idx_signal_feedback_signal_label on signal_feedback (signal_id, label);
+
+-- Compteurs de feedback par (signal, label), tenus à jour par trigger dans la
+-- transaction qui écrit signal_feedback (upsert API, check-links).
+-- Recalcul complet / contrôle: python -m app.feedback --rebuild
+create table if not exists signal_feedback_count (
+  signal_id int not null references signal(id) on delete cascade,
+  label text not null,
+  n int not null default 0,
+  primary key (signal_id, label)
+);
+create index if not exists idx_signal_feedback_count_label
+  on signal_feedback_count (label, signal_id) where n > 0;
+
+create or replace function apply_feedback_count() returns trigger
+language plpgsql as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into signal_feedback_count (signal_id, label, n)
+    select signal_id, label, count(*) from new_rows
+     group by 1, 2 order by 1, 2
+    on conflict (signal_id, label) do update
+      set n = signal_feedback_count.n + excluded.n;
+  elsif tg_op = 'UPDATE' then
+    insert into signal_feedback_count (signal_id, label, n)
+    select signal_id, label, sum(d) from (
+      select signal_id, label, 1 as d from new_rows
+      union all
+      select signal_id, label, -1 from old_rows
+    ) t
+     group by 1, 2 having sum(d) <> 0 order by 1, 2
+    on conflict (signal_id, label) do update
+      set n = signal_feedback_count.n + excluded.n;
+  else
+    -- pas d'insert: en cascade depuis signal, la ligne compteur a pu disparaître
+    update signal_feedback_count c
+       set n = c.n - o.cnt
+      from (select signal_id, label, count(*) as cnt from old_rows group by 1, 2) o
+     where c.signal_id = o.signal_id and c.label = o.label;
+  end if;
+  return null;
+end $$;
+
+create or replace trigger trg_feedback_count_ins after insert on signal_feedback
+  referencing new table as new_rows
+  for each statement execute function apply_feedback_count();
+create or replace trigger trg_feedback_count_upd after update on signal_feedback
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function apply_feedback_count();
+create or replace trigger trg_feedback_count_del after delete on signal_feedback
+  referencing old table as old_rows
+  for each statement execute function apply_feedback_count();
+
+-- Amorçage à la création (base existante); ensuite seuls les triggers écrivent
+insert into signal_feedback_count (signal_id, label, n)
+select signal_id, label, count(*) from signal_feedback
+ where not exists (select 1 from signal_feedback_count)
+ group by 1, 2
+on conflict do nothing;
+
+-- Scoring incrémental: couples (société, date) à rescorer.
+-- Alimenté par triggers (ingestion, feedback, éditions manuelles), vidé par recompute_dirty().
+create table if not exists score_dirty (
+  company_id int not null,
+  event_date date not null,
+  marked_at timestamptz not null default now(),
+  primary key (company_id, event_date)
+);
+
+create or replace function mark_score_dirty_from_signal() returns trigger
+language plpgsql as $$
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into score_dirty (company_id, event_date)
+    select distinct company_id, event_date from new_rows where company_id is not null
+    on conflict do nothing;
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into score_dirty (company_id, event_date)
+    select distinct company_id, event_date from old_rows where company_id is not null
+    on conflict do nothing;
+  end if;
+  return null;
+end $$;
+
+create or replace trigger trg_signal_dirty_ins after insert on signal
+  referencing new table as new_rows
+  for each statement execute function mark_score_dirty_from_signal();
+create or replace trigger trg_signal_dirty_upd after update on signal
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function mark_score_dirty_from_signal();
+create or replace trigger trg_signal_dirty_del after delete on signal
+  referencing old table as old_rows
+  for each statement execute function mark_score_dirty_from_signal();
+
+create or replace function mark_score_dirty_from_feedback() returns trigger
+language plpgsql as $$
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into score_dirty (company_id, event_date)
+    select distinct s.company_id, s.event_date
+      from new_rows f join signal s on s.id = f.signal_id
+     where s.company_id is not null
+    on conflict do nothing;
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into score_dirty (company_id, event_date)
+    select distinct s.company_id, s.event_date
+      from old_rows f join signal s on s.id = f.signal_id
+     where s.company_id is not null
+    on conflict do nothing;
+  end if;
+  return null;
+end $$;
+
+create or replace trigger trg_feedback_dirty_ins after insert on signal_feedback
+  referencing new table as new_rows
+  for each statement execute function mark_score_dirty_from_feedback();
+create or replace trigger trg_feedback_dirty_upd after update on signal_feedback
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function mark_score_dirty_from_feedback();
+create or replace trigger trg_feedback_dirty_del after delete on signal_feedback
+  referencing old table as old_rows
+  for each statement execute function mark_score_dirty_from_feedback();
+
+-- Registre des URLs + nettoyage des feedbacks (plus de clé étrangère vers signal partitionné)
+create or replace function sync_signal_url() returns trigger
+language plpgsql as $$
+begin
+  if tg_op = 'INSERT' then
+    -- conflit de clé primaire = URL déjà présente: unicité globale garantie
+    insert into signal_url (url, signal_id, event_date)
+    select url, id, event_date from new_rows;
+  elsif tg_op = 'UPDATE' then
+    delete from signal_url u
+     using old_rows o join new_rows n on n.id = o.id
+     where u.url = o.url and u.signal_id = o.id
+       and (o.url, o.event_date) is distinct from (n.url, n.event_date);
+    insert into signal_url (url, signal_id, event_date)
+    select n.url, n.id, n.event_date
+      from new_rows n join old_rows o on o.id = n.id
+     where (o.url, o.event_date) is distinct from (n.url, n.event_date);
+  else
+    delete from signal_url u using old_rows o where u.url = o.url and u.signal_id = o.id;
+    delete from signal_feedback f using old_rows o where f.signal_id = o.id;
+    delete from signal_feedback_count c using old_rows o where c.signal_id = o.id;
+    -- doublons d'un signal supprimé: redeviennent canoniques (rescorés via score_dirty)
+    update signal set dup_of = null where dup_of in (select id from old_rows);
+  end if;
+  return null;
+end $$;
+
+create or replace trigger trg_signal_url_ins after insert on signal
+  referencing new table as new_rows
+  for each statement execute function sync_signal_url();
+create or replace trigger trg_signal_url_upd after update on signal
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function sync_signal_url();
+create or replace trigger trg_signal_url_del after delete on signal
+  referencing old table as old_rows
+  for each statement execute function sync_signal_url();
+
+insert into signal_url (url, signal_id, event_date)
+select url, id, event_date from signal
+ where not exists (select 1 from signal_url)
+on conflict do nothing;
+
+-- Backfill des scores: checkpoint par chunk de dates (reprise après interruption)
+create table if not exists score_backfill_chunk (
+  run_key text not null,   -- 'date_from:date_to:chunk_days'
+  chunk_start date not null,
+  chunk_end date not null,
+  rows_upserted int not null,
+  rows_deleted int not null,
+  seconds numeric not null,
+  done_at timestamptz not null default now(),
+  primary key (run_key, chunk_start)
+);
+
+-- Chargement en masse des archives BODACC (app/bulk_load.py): checkpoint par fichier
+create table if not exists bulk_load_file (
+  path text primary key,
+  size bigint not null,
+  mtime bigint not null,
+  records_done bigint not null default 0,
+  inserted bigint not null default 0,
+  updated bigint not null default 0,
+  skipped bigint not null default 0,
+  seconds numeric not null default 0,
+  started_at timestamptz not null default now(),
+  finished_at timestamptz
+);
+
+-- Score glissant décroissant (30/90 j): demi-vie par type de signal
+create table if not exists signal_type_decay (
+  type text primary key,
+  half_life_days numeric not null check (half_life_days > 0)
+);
+insert into signal_type_decay (type, half_life_days) values
+  ('PROC_COLLECTIVE', 30),
+  ('SALE_OF_BUSINESS', 45),
+  ('M&A_PROJECT', 60),
+  ('OTHER', 14)
+on conflict (type) do nothing;
+
+-- Contributions décroissantes par (société, fenêtre, type), maintenues jour par jour
+create table if not exists company_score_rolling_type (
+  company_id int references company(id) on delete cascade,
+  window_days int not null,
+  type text not null,
+  score double precision not null,
+  as_of date not null,
+  primary key (company_id, window_days, type)
+);
+
+-- Score glissant matérialisé par société (lu par /api/scores/rolling)
+create table if not exists company_score_rolling (
+  company_id int references company(id) on delete cascade,
+  window_days int not null,
+  as_of date not null,
+  score double precision not null,
+  top_signal_type text,
+  primary key (company_id, window_days)
+);
+create index if not exists idx_score_rolling_window_score on company_score_rolling (window_days, score desc);
+
+-- stale: un score journalier <= as_of a changé depuis (rescoring, backfill) => rebuild
+create table if not exists score_rolling_state (
+  window_days int primary key,
+  as_of date not null,
+  stale boolean not null default false
+);
+alter table score_rolling_state add column if not exists day_snapshot date;
+
+-- Contributions du dernier jour publié (par fenêtre), rattrapées au pas suivant
+create table if not exists score_rolling_day (
+  window_days int not null,
+  company_id int not null references company(id) on delete cascade,
+  type text not null,
+  score double precision not null,
+  primary key (window_days, company_id, type)
+);
+create index if not exists idx_score_daily_date on company_score_daily (score_date);
+
+-- Recherche: plein texte français sur les extraits, trigrammes sur les sociétés
+create extension if not exists pg_trgm;
+alter table signal add column if not exists search_tsv tsvector
+  generated always as (to_tsvector('french', excerpt)) stored;
+create index if not exists idx_signal_search_tsv on signal using gin (search_tsv);
+create index if not exists idx_company_name_trgm on company using gin (name gin_trgm_ops);
+create index if not exists idx_company_siren_trgm on company using gin (siren gin_trgm_ops);
+
+-- Pagination keyset de /api/signals sur (event_date, id)
+create index if not exists idx_signal_date_id on signal (event_date desc, id desc);
+
+-- Dernier résultat de vérification par URL (check-links)
+create table if not exists link_status (
+  url text primary key,
+  status int,        -- null = échec réseau / timeout
+  error text,
+  checked_at timestamptz not null default now()
+);
+
+-- Historique des exécutions des jobs planifiés
+create table if not exists job_run (
+  id bigserial primary key,
+  job_id text not null,
+  status text not null, -- 'running' | 'ok' | 'error' | 'skipped'
+  started_at timestamptz not null default now(),
+  finished_at timestamptz,
+  duration_ms int,
+  rows_affected int,
+  details jsonb,
+  error text
+);
+create index if not exists idx_job_run_job_started on job_run (job_id, started_at desc);
+create index if not exists idx_job_run_started on job_run (started_at desc);
+
+-- Invalidation du cache des fiches utilisateur (app/auth.py) à chaque modification
+create or replace function notify_client_user_changed() returns trigger
+language plpgsql as $$
+begin
+  perform pg_notify('radar_cache', json_build_object(
+    'node', 'db', 'users', json_build_array(coalesce(new.id, old.id)))::text);
+  return null;
+end $$;
+
+create or replace trigger trg_client_user_notify after update or delete on client_user
+  for each row execute function notify_client_user_changed();
+
+-- Quasi-doublons (app/dedup.py): empreinte SimHash de l'extrait, seaux LSH
+-- (8 bandes de 8 bits préfixées par la société) et rattachement au signal canonique.
+-- simhash = 0: extrait sans mots, jamais comparé
+alter table signal add column if not exists simhash bigint;
+alter table signal add column if not exists dup_of int;
+alter table signal add column if not exists simhash_bands bigint[] generated always as (
+  case when simhash is not null and simhash <> 0 and company_id is not null then array[
+      (company_id::bigint * 8 + 0) * 256 + ((simhash >> 0) & 255),
+      (company_id::bigint * 8 + 1) * 256 + ((simhash >> 8) & 255),
+      (company_id::bigint * 8 + 2) * 256 + ((simhash >> 16) & 255),
+      (company_id::bigint * 8 + 3) * 256 + ((simhash >> 24) & 255),
+      (company_id::bigint * 8 + 4) * 256 + ((simhash >> 32) & 255),
+      (company_id::bigint * 8 + 5) * 256 + ((simhash >> 40) & 255),
+      (company_id::bigint * 8 + 6) * 256 + ((simhash >> 48) & 255),
+      (company_id::bigint * 8 + 7) * 256 + ((simhash >> 56) & 255)
+  ] end
+) stored;
+create index if not exists idx_signal_simhash_bands on signal using gin (simhash_bands);
+create index if not exists idx_signal_dup_of on signal (dup_of) where dup_of is not null;
+
+-- Alertes clients (app/alerts.py): une ligne par (client, société, jour de score),
+-- upsert idempotent; notified_at nul = à notifier dans le prochain envoi groupé
+create table if not exists client_alert (
+  id bigserial primary key,
+  client_id int not null references client(id) on delete cascade,
+  company_id int not null references company(id) on delete cascade,
+  score_date date not null,
+  score numeric not null,
+  top_signal_type text,
+  naf_prefix text, -- abonnement déclencheur (null = client sans filtre sectoriel)
+  created_at timestamptz not null default now(),
+  updated_at timestamptz not null default now(),
+  notified_at timestamptz,
+  unique (client_id, company_id, score_date)
+);
+create index if not exists idx_client_alert_pending on client_alert (client_id) where notified_at is null;
+
+-- Génération des documents (app/documents.py): un document par (client, type, période),
+-- content_hash = empreinte des données rendues (pas de re-rendu si inchangée);
+-- path relatif à DOCUMENTS_DIR
+alter table document_pdf add column if not exists period_start date;
+alter table document_pdf add column if not exists title text;
+alter table document_pdf add column if not exists content_hash text;
+alter table document_pdf add column if not exists size_bytes int;
+create unique index if not exists uq_docpdf_client_kind_period on document_pdf (client_id, kind, period_start);
+
+-- Listing /api/documents: recherche texte sur le titre, keyset (published_at, id)
+alter table document_pdf add column if not exists search_tsv tsvector
+  generated always as (to_tsvector('french', coalesce(title, ''))) stored;
+create index if not exists idx_docpdf_search_tsv on document_pdf using gin (search_tsv);
+create index if not exists idx_docpdf_client_published on document_pdf (client_id, published_at desc, id desc);
+
+-- Facettes par client (secteur, type, semaine, type de document), tenues à jour
+-- par trigger: /api/documents les lit sans group by sur document_pdf
+create table if not exists document_facet (
+  client_id int not null references client(id) on delete cascade,
+  facet text not null, -- 'sector' | 'type' | 'week' | 'kind'
+  value text not null,
+  n int not null default 0,
+  primary key (client_id, facet, value)
+);
+
+create or replace function apply_document_facet() returns trigger
+language plpgsql as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into document_facet (client_id, facet, value, n)
+    select r.client_id, f.facet, f.value, count(*)
+      from new_rows r
+     cross join lateral (values ('sector', r.sector_tag), ('type', r.top_signal_type),
+                                ('week', r.week_label), ('kind', r.kind)) as f(facet, value)
+     where r.client_id is not null and f.value is not null
+     group by 1, 2, 3 order by 1, 2, 3
+    on conflict (client_id, facet, value) do update
+      set n = document_facet.n + excluded.n;
+  elsif tg_op = 'UPDATE' then
+    insert into document_facet (client_id, facet, value, n)
+    select client_id, facet, value, sum(d) from (
+      select r.client_id, f.facet, f.value, 1 as d
+        from new_rows r
+       cross join lateral (values ('sector', r.sector_tag), ('type', r.top_signal_type),
+                                  ('week', r.week_label), ('kind', r.kind)) as f(facet, value)
+      union all
+      select r.client_id, f.facet, f.value, -1
+        from old_rows r
+       cross join lateral (values ('sector', r.sector_tag), ('type', r.top_signal_type),
+                                  ('week', r.week_label), ('kind', r.kind)) as f(facet, value)
+    ) t
+     where client_id is not null and value is not null
+     group by 1, 2, 3 having sum(d) <> 0 order by 1, 2, 3
+    on conflict (client_id, facet, value) do update
+      set n = document_facet.n + excluded.n;
+  else
+    -- pas d'insert: en cascade depuis client, la ligne facette a pu disparaître
+    update document_facet c
+       set n = c.n - o.cnt
+      from (
+        select r.client_id, f.facet, f.value, count(*) as cnt
+          from old_rows r
+         cross join lateral (values ('sector', r.sector_tag), ('type', r.top_signal_type),
+                                    ('week', r.week_label), ('kind', r.kind)) as f(facet, value)
+         where r.client_id is not null and f.value is not null
+         group by 1, 2, 3
+      ) o
+     where c.client_id = o.client_id and c.facet = o.facet and c.value = o.value;
+  end if;
+  return null;
+end $$;
+
+create or replace trigger trg_document_facet_ins after insert on document_pdf
+  referencing new table as new_rows
+  for each statement execute function apply_document_facet();
+create or replace trigger trg_document_facet_upd after update on document_pdf
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function apply_document_facet();
+create or replace trigger trg_document_facet_del after delete on document_pdf
+  referencing old table as old_rows
+  for each statement execute function apply_document_facet();
+
+insert into document_facet (client_id, facet, value, n)
+select d.client_id, f.facet, f.value, count(*)
+  from document_pdf d
+ cross join lateral (values ('sector', d.sector_tag), ('type', d.top_signal_type),
+                            ('week', d.week_label), ('kind', d.kind)) as f(facet, value)
+ where not exists (select 1 from document_facet)
+   and d.client_id is not null and f.value is not null
+ group by 1, 2, 3
+on conflict do nothing;
@@ -0,0 +1,218 @@
+"""
+Partitionnement mensuel (range) de signal (event_date) et company_score_daily
+(score_date).
+
+- migrate_to_partitions(): conversion en place d'une table classique en table
+  partitionnée (renommage, création des partitions couvrant les données, copie,
+  suppression de l'ancienne table), une transaction par table.
+- ensure_partitions() / ensure_future_partitions(): création à l'avance des
+  partitions (bootstrap, job quotidien, ingestion de dates hors plage).
+- detach_expired_partitions(): rétention; les partitions plus anciennes que
+  *_RETENTION_MONTHS sont détachées et déplacées dans le schéma "archive"
+  (données conservées, hors des requêtes; suppression manuelle).
+
+Les index et triggers des tables partitionnées viennent de models.sql, rejoué
+par init_db() après la migration.
+"""
+import datetime
+import os
+
+from app.db import connection
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# 0 = pas de rétention
+SIGNAL_RETENTION_MONTHS = int(os.getenv("SIGNAL_RETENTION_MONTHS", "36"))
+SCORE_RETENTION_MONTHS = int(os.getenv("SCORE_RETENTION_MONTHS", "36"))
+ARCHIVE_SCHEMA = "archive"
+
+# table -> (colonne de partition, clé primaire, clés étrangères)
+PARTITIONED_TABLES = {
+    "signal": (
+        "event_date",
+        "(id, event_date)",
+        ["foreign key (company_id) references company(id) on delete cascade"],
+    ),
+    "company_score_daily": (
+        "score_date",
+        "(company_id, score_date)",
+        ["foreign key (company_id) references company(id) on delete cascade"],
+    ),
+}
+RETENTION_MONTHS = {"signal": SIGNAL_RETENTION_MONTHS, "company_score_daily": SCORE_RETENTION_MONTHS}
+
+
+def month_start(d: datetime.date) -> datetime.date:
+    return d.replace(day=1)
+
+
+def add_months(d: datetime.date, n: int) -> datetime.date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return datetime.date(y, m + 1, 1)
+
+
+def month_range(first: datetime.date, last: datetime.date) -> list[datetime.date]:
+    months, m = [], month_start(first)
+    while m <= last:
+        months.append(m)
+        m = add_months(m, 1)
+    return months
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute("select relkind from pg_class where oid = to_regclass(%s);", (f"public.{table}",))
+    row = cur.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def ensure_partitions(cur, table: str, months) -> int:
+    """Crée les partitions mensuelles manquantes de table; retourne le nombre créé."""
+    created = 0
+    for m in sorted({month_start(m) for m in months}):
+        name = partition_name(table, m)
+        cur.execute("select to_regclass(%s) is null;", (f"public.{name}",))
+        if not cur.fetchone()[0]:
+            continue
+        cur.execute(
+            f"create table if not exists {name} partition of {table} "
+            f"for values from ('{m.isoformat()}') to ('{add_months(m, 1).isoformat()}');"
+        )
+        created += 1
+    return created
+
+
+def ensure_months_for_dates(cur, dates) -> int:
+    """Partitions signal + scores pour les mois de dates (ingestion de dates hors plage)."""
+    months = {month_start(d) for d in dates if d is not None}
+    return sum(ensure_partitions(cur, t, months) for t in PARTITIONED_TABLES)
+
+
+def _migrate_table(cur, table: str) -> int:
+    key, pk, fks = PARTITIONED_TABLES[table]
+    legacy = f"{table}_legacy"
+    cur.execute(f"lock table {table} in access exclusive mode;")
+    cur.execute(f"select min({key}), max({key}), count(*) from {table};")
+    d0, d1, n = cur.fetchone()
+    seq = None
+    if table == "signal":
+        cur.execute("select pg_get_serial_sequence(%s, 'id');", (table,))
+        seq = cur.fetchone()[0]
+
+    cur.execute(f"alter table {table} rename to {legacy};")
+    cur.execute(f"""
+        create table {table} (
+          like {legacy} including defaults including generated including constraints,
+          primary key {pk}
+        ) partition by range ({key});
+    """)
+    for fk in fks:
+        cur.execute(f"alter table {table} add {fk};")
+
+    today = datetime.date.today()
+    first = min(d0, today) if d0 else today
+    last = max(d1, today) if d1 else today
+    ensure_partitions(cur, table, month_range(first, add_months(last, PARTITION_MONTHS_AHEAD)))
+
+    # colonnes générées exclues (recalculées à l'insertion)
+    cur.execute("""
+        select string_agg(quote_ident(column_name), ', ' order by ordinal_position)
+          from information_schema.columns
+         where table_schema = 'public' and table_name = %s and is_generated = 'NEVER';
+    """, (legacy,))
+    cols = cur.fetchone()[0]
+    cur.execute(f"insert into {table} ({cols}) select {cols} from {legacy};")
+    if seq:
+        cur.execute(f"alter sequence {seq} owned by {table}.id;")
+    # cascade: supprime aussi les clés étrangères qui pointaient vers l'ancienne table
+    cur.execute(f"drop table {legacy} cascade;")
+    return int(n)
+
+
+def migrate_to_partitions(conn) -> dict:
+    """
+    Convertit en place les tables encore non partitionnées. Chaque table est
+    verrouillée (access exclusive) et copiée dans sa transaction: à lancer
+    dans une fenêtre de maintenance sur une grosse base. Retourne {table: lignes}.
+    """
+    migrated = {}
+    for table in PARTITIONED_TABLES:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                if is_partitioned(cur, table):
+                    continue
+                migrated[table] = _migrate_table(cur, table)
+    return migrated
+
+
+def ensure_future_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> dict:
+    """Partitions du mois courant à months_ahead mois (job quotidien + bootstrap)."""
+    today = datetime.date.today()
+    months = month_range(today, add_months(today, months_ahead))
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("select pg_advisory_xact_lock(hashtext('partitions'));")
+            return {t: ensure_partitions(cur, t, months) for t in PARTITIONED_TABLES}
+
+
+def detach_expired_partitions() -> dict:
+    """
+    Détache les partitions entièrement antérieures à la rétention et les range
+    dans le schéma archive. Les URLs des signaux archivés sortent de signal_url
+    (une même annonce réingérée plus tard recrée un signal) et leurs feedbacks
+    (signal_feedback, signal_feedback_count) sont supprimés.
+    """
+    today = datetime.date.today()
+    detached: dict[str, list[str]] = {}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("select pg_advisory_xact_lock(hashtext('partitions'));")
+            cur.execute(f"create schema if not exists {ARCHIVE_SCHEMA};")
+            cur.execute("set local lock_timeout = '5s';")
+            for table, months in RETENTION_MONTHS.items():
+                if months <= 0:
+                    continue
+                cutoff = add_months(month_start(today), -months)
+                cur.execute("""
+                    select c.relname
+                      from pg_inherits i
+                      join pg_class c on c.oid = i.inhrelid
+                     where i.inhparent = to_regclass(%s)
+                       and c.relname ~ '_p[0-9]{4}_[0-9]{2}$'
+                     order by c.relname;
+                """, (f"public.{table}",))
+                names = [r[0] for r in cur.fetchall()]
+                for name in names:
+                    y, m = name.rsplit("_p", 1)[1].split("_")
+                    if datetime.date(int(y), int(m), 1) >= cutoff:
+                        continue
+                    if table == "signal":
+                        cur.execute(f"delete from signal_url u using {name} s where u.signal_id = s.id;")
+                    cur.execute(f"alter table {table} detach partition {name};")
+                    if table == "signal":
+                        # feedbacks des signaux archivés, dans la même transaction; après le
+                        # detach, le trigger de feedback ne remarque plus leurs dates à rescorer
+                        cur.execute(f"delete from signal_feedback f using {name} s where f.signal_id = s.id;")
+                        cur.execute(f"delete from signal_feedback_count c using {name} s where c.signal_id = s.id;")
+                    target = name
+                    cur.execute("select to_regclass(%s) is not null;", (f"{ARCHIVE_SCHEMA}.{name}",))
+                    if cur.fetchone()[0]:
+                        # déjà archivée une fois (réingestion de vieilles dates): suffixe daté
+                        target = f"{name}_{today.strftime('%Y%m%d')}"
+                        cur.execute(f"alter table {name} rename to {target};")
+                    cur.execute(f"alter table {target} set schema {ARCHIVE_SCHEMA};")
+                    detached.setdefault(table, []).append(target)
+    return {"detached": detached, "partitions_detached": sum(len(v) for v in detached.values())}
+
+
+def maintain_partitions() -> dict:
+    """Job planifié: partitions à venir puis rétention."""
+    return {"created": ensure_future_partitions(), **detach_expired_partitions()}
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(maintain_partitions(), indent=2))
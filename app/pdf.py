@@ -0,0 +1,73 @@
+"""
+Rendu PDF minimal (texte seul, polices standard Helvetica), sans dépendance:
+suffisant pour les briefs / digests, appelable depuis un process pool.
+"""
+import textwrap
+
+PAGE_W, PAGE_H = 595, 842  # A4 en points
+MARGIN = 50
+# style -> (police, taille, interligne, largeur de ligne en caractères)
+STYLES = {
+    "h1": ("F2", 16, 24, 60),
+    "h2": ("F2", 12, 18, 80),
+    "p": ("F1", 10, 13, 100),
+    "small": ("F1", 8, 11, 125),
+}
+
+
+def _escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _layout(blocks: list[tuple[str, str]]) -> list[list[tuple[str, int, int, str]]]:
+    # blocs (style, texte) -> pages de lignes (police, taille, y, texte)
+    pages, page, y = [], [], PAGE_H - MARGIN
+    for style, text in blocks:
+        font, size, leading, width = STYLES[style]
+        for line in textwrap.wrap(text, width) or [""]:
+            if y - leading < MARGIN:
+                pages.append(page)
+                page, y = [], PAGE_H - MARGIN
+            y -= leading
+            page.append((font, size, y, line))
+    pages.append(page)
+    return pages
+
+
+def render_pdf(blocks: list[tuple[str, str]], title: str = "") -> bytes:
+    """PDF (bytes) à partir de blocs (style, texte); style parmi STYLES."""
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages, complété quand les pages sont connues
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Title (" + _escape(title) + b") /Producer (Radar FR) >>",
+    ]
+    kids = []
+    for lines in _layout(blocks):
+        ops = [b"BT"]
+        for font, size, y, text in lines:
+            ops.append(b"/%s %d Tf 1 0 0 1 %d %d Tm (%s) Tj"
+                       % (font.encode(), size, MARGIN, y, _escape(text)))
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                       % (PAGE_W, PAGE_H, len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref)
+    return bytes(out)
@@ -0,0 +1,191 @@
+import datetime
+
+from app.db import connection
+from app.cache import response_cache
+
+ROLLING_WINDOWS = (30, 90)
+DEFAULT_HALF_LIFE_DAYS = 30
+# En dessous, une contribution est considérée comme expirée
+EPSILON = 1e-6
+
+# Taux de décroissance par type (ln2 / demi-vie); type inconnu -> demi-vie par défaut
+_DECAY_CTE = """
+    decay as (
+      select type, ln(2) / half_life_days::double precision as lam from signal_type_decay
+    )
+"""
+
+
+def _rebuild_window(cur, window_days: int, as_of: datetime.date):
+    # Forme close: somme des scores journaliers de la fenêtre, décrus jusqu'à as_of
+    cur.execute("delete from company_score_rolling_type where window_days = %s;", (window_days,))
+    cur.execute(
+        f"""
+        with {_DECAY_CTE}
+        insert into company_score_rolling_type (company_id, window_days, type, score, as_of)
+        select d.company_id, %(w)s, coalesce(d.top_signal_type, 'OTHER'),
+               sum(d.score_total::double precision
+                   * exp(-coalesce(k.lam, ln(2) / %(hl)s) * (%(t)s::date - d.score_date))),
+               %(t)s::date
+          from company_score_daily d
+     left join decay k on k.type = coalesce(d.top_signal_type, 'OTHER')
+         where d.score_date > %(t)s::date - %(w)s and d.score_date <= %(t)s::date
+         group by 1, 3;
+        """,
+        {"w": window_days, "t": as_of, "hl": DEFAULT_HALF_LIFE_DAYS},
+    )
+
+
+def _snapshot_day(cur, window_days: int, as_of: datetime.date):
+    # Contributions du jour as_of telles qu'intégrées à l'état: le pas suivant
+    # y rattrape un rescoring du jour publié sans reconstruction complète
+    cur.execute("delete from score_rolling_day where window_days = %s;", (window_days,))
+    cur.execute(
+        """
+        insert into score_rolling_day (window_days, company_id, type, score)
+        select %s, company_id, coalesce(top_signal_type, 'OTHER'), sum(score_total::double precision)
+          from company_score_daily
+         where score_date = %s
+         group by 2, 3;
+        """,
+        (window_days, as_of),
+    )
+
+
+def _resync_day(cur, window_days: int, day: datetime.date):
+    """Applique à l'état (encore à day) l'écart entre les scores actuels de day et le snapshot."""
+    cur.execute(
+        """
+        with cur_day as (
+          select company_id, coalesce(top_signal_type, 'OTHER') as type,
+                 sum(score_total::double precision) as s
+            from company_score_daily
+           where score_date = %(d)s::date
+           group by 1, 2
+        ),
+        snap as (
+          select company_id, type, score from score_rolling_day where window_days = %(w)s
+        ),
+        delta as (
+          select coalesce(c.company_id, o.company_id) as company_id, coalesce(c.type, o.type) as type,
+                 coalesce(c.s, 0) - coalesce(o.score, 0) as s
+            from cur_day c
+            full join snap o on o.company_id = c.company_id and o.type = c.type
+           where coalesce(c.s, 0) <> coalesce(o.score, 0)
+        )
+        insert into company_score_rolling_type (company_id, window_days, type, score, as_of)
+        select company_id, %(w)s, type, s, %(d)s::date from delta
+        on conflict (company_id, window_days, type) do update
+          set score = company_score_rolling_type.score + excluded.score;
+        """,
+        {"w": window_days, "d": day},
+    )
+
+
+def _step_window(cur, window_days: int, as_of: datetime.date):
+    """Passe de as_of-1 à as_of: décroît l'existant, ajoute le jour, expire le jour sorti."""
+    params = {"w": window_days, "t": as_of, "hl": DEFAULT_HALF_LIFE_DAYS}
+    # 0) rescoring éventuel de as_of-1 depuis sa publication
+    _resync_day(cur, window_days, as_of - datetime.timedelta(days=1))
+    # 1) décroissance d'un jour
+    cur.execute(
+        """
+        update company_score_rolling_type r
+           set score = r.score * exp(-coalesce(
+                 (select ln(2) / k.half_life_days::double precision
+                    from signal_type_decay k where k.type = r.type),
+                 ln(2) / %(hl)s)),
+               as_of = %(t)s::date
+         where r.window_days = %(w)s;
+        """,
+        params,
+    )
+    # 2) contribution du jour, 3) retrait du jour qui sort de la fenêtre (décru sur w jours)
+    cur.execute(
+        f"""
+        with {_DECAY_CTE},
+        delta as (
+          select d.company_id, coalesce(d.top_signal_type, 'OTHER') as type,
+                 sum(case when d.score_date = %(t)s::date
+                          then d.score_total::double precision
+                          else -d.score_total::double precision
+                               * exp(-coalesce(k.lam, ln(2) / %(hl)s) * %(w)s) end) as s
+            from company_score_daily d
+       left join decay k on k.type = coalesce(d.top_signal_type, 'OTHER')
+           where d.score_date in (%(t)s::date, %(t)s::date - %(w)s)
+           group by 1, 2
+        )
+        insert into company_score_rolling_type (company_id, window_days, type, score, as_of)
+        select company_id, %(w)s, type, s, %(t)s::date from delta
+        on conflict (company_id, window_days, type) do update
+          set score = company_score_rolling_type.score + excluded.score,
+              as_of = excluded.as_of;
+        """,
+        params,
+    )
+    cur.execute(
+        "delete from company_score_rolling_type where window_days = %s and score < %s;",
+        (window_days, EPSILON),
+    )
+
+
+def _publish_window(cur, window_days: int, as_of: datetime.date) -> int:
+    # Total par société + type dominant, republié pour la fenêtre
+    cur.execute("delete from company_score_rolling where window_days = %s;", (window_days,))
+    cur.execute(
+        """
+        insert into company_score_rolling (company_id, window_days, as_of, score, top_signal_type)
+        select company_id, window_days, %s::date, sum(score),
+               (array_agg(type order by score desc))[1]
+          from company_score_rolling_type
+         where window_days = %s
+         group by company_id, window_days;
+        """,
+        (as_of, window_days),
+    )
+    n = cur.rowcount
+    cur.execute(
+        """
+        insert into score_rolling_state (window_days, as_of, stale, day_snapshot) values (%s, %s, false, %s)
+        on conflict (window_days) do update
+          set as_of = excluded.as_of, stale = false, day_snapshot = excluded.day_snapshot;
+        """,
+        (window_days, as_of, as_of),
+    )
+    return n
+
+
+def refresh_rolling(as_of=None, rebuild: bool = False) -> dict:
+    """
+    Met à jour les scores glissants (fenêtres ROLLING_WINDOWS) à la date as_of.
+    Incrémental si l'état est à J-1 (décroissance + jour entrant - jour sortant),
+    sinon reconstruction complète depuis company_score_daily: premier run, trou,
+    état marqué stale par un rescoring/backfill d'un jour antérieur au dernier
+    jour publié, ou rebuild=True. Un rescoring du dernier jour publié est
+    rattrapé au pas suivant (snapshot score_rolling_day).
+    """
+    as_of = datetime.date.fromisoformat(str(as_of)) if as_of else datetime.date.today()
+    out = {}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for w in ROLLING_WINDOWS:
+                # verrou par fenêtre: deux refresh concurrents ne s'entrelacent pas
+                cur.execute("select pg_advisory_xact_lock(hashtext('score_rolling'), %s);", (w,))
+                cur.execute("select as_of, stale, day_snapshot from score_rolling_state where window_days = %s;", (w,))
+                row = cur.fetchone()
+                prev, stale, snap = row if row else (None, False, None)
+                if not rebuild and not stale and prev == as_of:
+                    out[w] = {"mode": "noop", "as_of": as_of.isoformat()}
+                    continue
+                # pas incrémental: état à J-1 avec son snapshot du jour (sinon rattrapage impossible)
+                if not rebuild and not stale and prev == as_of - datetime.timedelta(days=1) and snap == prev:
+                    _step_window(cur, w, as_of)
+                    mode = "incremental"
+                else:
+                    _rebuild_window(cur, w, as_of)
+                    mode = "rebuild"
+                _snapshot_day(cur, w, as_of)
+                n = _publish_window(cur, w, as_of)
+                out[w] = {"mode": mode, "as_of": as_of.isoformat(), "companies": n}
+    response_cache.invalidate("rolling")
+    return out
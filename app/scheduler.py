@@ -1,25 +1,206 @@
+import asyncio
+import datetime
+import os
+import time
+import traceback
+
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from psycopg.types.json import Jsonb
 import pytz
 
+from app.db import connection
+from app.cluster import LeaderElector
+
 # Tes jobs réels
-from app.scoring import recompute_daily
+from app.scoring import recompute_dirty
+from app.rolling import refresh_rolling
+from app.linkcheck import run_link_check
+from app.partitions import maintain_partitions
+from app.alerts import run_alerts
+from app.documents import generate_daily_briefs, generate_weekly_digests
+
+# Les jobs tournent dans un pool de threads: jamais sur la boucle d'événements HTTP
+JOB_EXECUTOR_WORKERS = int(os.getenv("JOB_EXECUTOR_WORKERS", "4"))
+# Retard toléré avant qu'un déclenchement soit considéré comme manqué
+JOB_MISFIRE_GRACE = int(os.getenv("JOB_MISFIRE_GRACE", "3600"))
+# "0" pour des réplicas purement web qui ne candidatent jamais au rôle de leader
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
 
-# Exemple de stub pour plus tard
 def check_links():
-    # TODO: implémenter la vérif des liens récents (lookback 7-14j)
-    # Pour l’instant, un simple log:
-    print("[check-links] running…")
+    # Liens des 14 derniers jours non vérifiés depuis LINK_CHECK_RECHECK_HOURS
+    # (boucle asyncio dédiée, dans le thread du job)
+    return asyncio.run(run_link_check(lookback_days=14))
+
+def recompute_dirty_and_alerts():
+    # Score du jour via la file score_dirty (coût proportionnel aux changements;
+    # le recalcul complet reste réservé à /admin et au backfill), puis alertes
+    # clients dans le même run
+    return {**recompute_dirty(), **run_alerts()}
+
+# --- Historique des runs + protection contre les chevauchements ---
+def _rows_affected(result) -> int | None:
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict):
+        for key in ("upserted", "dirty_processed", "scanned", "rows_upserted", "partitions_detached", "rendered"):
+            if isinstance(result.get(key), int):
+                return result[key]
+    return None
+
+def _record_start(job_id: str, status: str = "running") -> int:
+    with connection() as conn:
+        row = conn.execute("""
+            insert into job_run (job_id, status, started_at)
+            values (%s, %s, now())
+            returning id;
+        """, (job_id, status)).fetchone()
+        return row[0]
+
+def _record_end(run_id: int, status: str, duration_ms: int, result=None, error: str | None = None):
+    with connection() as conn:
+        conn.execute("""
+            update job_run
+               set status = %s, finished_at = now(), duration_ms = %s,
+                   rows_affected = %s, details = %s, error = %s
+             where id = %s;
+        """, (status, duration_ms, _rows_affected(result),
+              Jsonb(result) if isinstance(result, dict) else None, error, run_id))
+
+def run_tracked(job_id: str, fn, *args, **kwargs):
+    """
+    Exécute un job en l'enregistrant dans job_run. Un verrou advisory Postgres
+    (session) par job_id empêche deux runs simultanés, y compris entre process:
+    un run qui ne l'obtient pas est tracé 'skipped'.
+    """
+    with connection() as lock_conn:
+        got = lock_conn.execute("select pg_try_advisory_lock(hashtext(%s));", (f"job:{job_id}",)).fetchone()[0]
+        lock_conn.commit()  # le verrou de session survit, pas de transaction ouverte pendant le job
+        if not got:
+            _record_end(_record_start(job_id, "skipped"), "skipped", 0)
+            print(f"[scheduler] {job_id}: déjà en cours, run ignoré")
+            return None
+        try:
+            run_id = _record_start(job_id)
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                _record_end(run_id, "error", int((time.perf_counter() - t0) * 1000),
+                            error=f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}")
+                raise
+            _record_end(run_id, "ok", int((time.perf_counter() - t0) * 1000), result=result)
+            return result
+        finally:
+            lock_conn.execute("select pg_advisory_unlock(hashtext(%s));", (f"job:{job_id}",))
+
+def recent_runs(job_id: str | None = None, limit: int = 50) -> list[dict]:
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                select id, job_id, status, started_at, finished_at, duration_ms, rows_affected, error
+                  from job_run
+                 where (%s::text is null or job_id = %s)
+                 order by started_at desc
+                 limit %s;
+            """, (job_id, job_id, limit))
+            cols = [d[0] for d in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+def _catch_up(sched):
+    """
+    Rattrapage après redémarrage: si un déclenchement prévu depuis le dernier run
+    est passé (process arrêté à ce moment-là), le job est relancé immédiatement.
+    """
+    now = datetime.datetime.now(sched.timezone)
+    with connection() as conn:
+        last = dict(conn.execute("""
+            select job_id, max(started_at) from job_run
+             where status in ('ok', 'error')
+             group by job_id;
+        """).fetchall())
+    for job in sched.get_jobs():
+        last_start = last.get(job.id)
+        if last_start is None:
+            continue
+        due = job.trigger.get_next_fire_time(None, last_start.astimezone(sched.timezone))
+        if due and due < now and (job.next_run_time is None or job.next_run_time > now):
+            print(f"[scheduler] {job.id}: run manqué ({due.isoformat()}), rattrapage")
+            job.modify(next_run_time=now)
 
 def start_jobs(app):
     tz = pytz.timezone("Europe/Paris")
-    sched = AsyncIOScheduler(timezone=tz)
+    sched = AsyncIOScheduler(
+        timezone=tz,
+        executors={"default": ThreadPoolExecutor(JOB_EXECUTOR_WORKERS)},
+        # un seul run à la fois par job, déclenchements en retard fusionnés
+        job_defaults={"max_instances": 1, "coalesce": True, "misfire_grace_time": JOB_MISFIRE_GRACE},
+    )
+
+    def add(job_id, fn, trigger):
+        sched.add_job(run_tracked, trigger, args=(job_id, fn), id=job_id, replace_existing=True)
 
-    # 1) Score quotidien (06:00 CET/CEST)
-    sched.add_job(recompute_daily, CronTrigger(hour=6, minute=0, timezone=tz), id="recompute-daily", replace_existing=True)
+    # 1) Score quotidien (06:00 CET/CEST, incrémental), puis alertes clients
+    add("recompute-daily", recompute_dirty_and_alerts, CronTrigger(hour=6, minute=0, timezone=tz))
+
+    # 1a) Scores glissants 30/90 j, après le score du jour
+    add("refresh-rolling", refresh_rolling, CronTrigger(hour=6, minute=15, timezone=tz))
+
+    # 1b) Scoring incrémental (couples société/date modifiés) toutes les 15 min
+    add("recompute-dirty", recompute_dirty, CronTrigger(minute="*/15", timezone=tz))
+
+    # 1c) Briefs PDF du jour (après scores + alertes), digest hebdo le lundi
+    add("documents-daily", generate_daily_briefs, CronTrigger(hour=6, minute=30, timezone=tz))
+    add("documents-weekly", generate_weekly_digests, CronTrigger(day_of_week="mon", hour=7, minute=0, timezone=tz))
 
     # 2) Vérif des liens toutes les 3h
-    sched.add_job(check_links, CronTrigger(minute=0, hour="*/3", timezone=tz), id="check-links", replace_existing=True)
+    add("check-links", check_links, CronTrigger(minute=0, hour="*/3", timezone=tz))
+
+    # 3) Partitions mensuelles à venir + rétention (détache les mois expirés)
+    add("partition-maintenance", maintain_partitions, CronTrigger(hour=5, minute=30, timezone=tz))
+
+    if not SCHEDULER_ENABLED:
+        print("[scheduler] désactivé (SCHEDULER_ENABLED=0)")
+        return
+
+    # Démarré en pause dans chaque worker; seul le leader (verrou advisory) le relance
+    sched.start(paused=True)
+
+    def on_elected():
+        sched.resume()
+        try:
+            _catch_up(sched)
+        except Exception as e:
+            print(f"[scheduler] rattrapage impossible: {e}")
+        print("[scheduler] jobs started (leader)")
+
+    def on_lost():
+        sched.pause()
+        print("[scheduler] leadership perdu, jobs en pause")
+
+    elector = LeaderElector("scheduler", on_elected, on_lost)
+    elector.start()
+    app.state.scheduler = sched
+    app.state.scheduler_elector = elector
+
+def scheduler_status(app) -> dict:
+    sched = getattr(app.state, "scheduler", None)
+    elector = getattr(app.state, "scheduler_elector", None)
+    return {
+        "enabled": SCHEDULER_ENABLED,
+        "pid": os.getpid(),
+        "leader": bool(elector and elector.is_leader),
+        "jobs": [
+            {"id": j.id, "next_run_time": j.next_run_time.isoformat() if j.next_run_time else None}
+            for j in (sched.get_jobs() if sched else [])
+        ],
+    }
 
-    sched.start()
-    print("[scheduler] jobs started")
+def stop_jobs(app):
+    elector = getattr(app.state, "scheduler_elector", None)
+    if elector:
+        elector.stop()
+    sched = getattr(app.state, "scheduler", None)
+    if sched and sched.running:
+        sched.shutdown(wait=False)
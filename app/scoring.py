@@ -1,9 +1,89 @@
-import os
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import psycopg
+from app.db import connection, get_pool
+from app.cache import response_cache
 
-DB_URL = os.getenv("DB_URL", "postgresql://radar:radarpass@db:5432/radar")
+
+def _recompute_range(cur, date_from, date_to) -> tuple[int, int]:
+    """
+    Recalcule en une requête les scores de toutes les sociétés entre deux dates
+    (bornes incluses) et supprime les scores devenus orphelins sur la plage.
+    Retourne (lignes insérées / mises à jour, lignes supprimées).
+    """
+    # Aggrège les poids, prend le type dominant et une explication simple
+    cur.execute(
+        """
+        with day_signals as (
+          select
+            s.company_id,
+            s.event_date,
+            s.type,
+            sum(s.weight) as weight_sum,
+            count(*) as cnt
+          from signal s
+          where s.event_date between %(d0)s::date and %(d1)s::date
+            and s.company_id is not null
+            and s.dup_of is null  -- quasi-doublons comptés une fois (app/dedup.py)
+          group by 1, 2, 3
+        ),
+        per_company as (
+          select
+            company_id,
+            event_date,
+            sum(weight_sum) as score_total,
+            -- type dominant = plus gros poids cumulé, tie-break par cnt
+            (array_agg(type order by weight_sum desc, cnt desc))[1] as top_type
+          from day_signals
+          group by 1, 2
+        ),
+        upserted as (
+          insert into company_score_daily(
+              company_id,
+              score_date,
+              score_total,
+              top_signal_type,
+              explanation
+          )
+          select
+            company_id,
+            event_date,
+            score_total,
+            top_type,
+            'Somme pondérée des signaux du ' || event_date::text
+          from per_company
+          on conflict (company_id, score_date) do update
+            set score_total = excluded.score_total,
+                top_signal_type = excluded.top_signal_type,
+                explanation = excluded.explanation
+          returning company_id
+        ),
+        deleted as (
+          delete from company_score_daily cs
+           where cs.score_date between %(d0)s::date and %(d1)s::date
+             and not exists (
+               select 1 from per_company p
+                where p.company_id = cs.company_id and p.event_date = cs.score_date
+             )
+          returning cs.company_id
+        ),
+        -- scores glissants à reconstruire: plage touchant un jour déjà intégré à la
+        -- fenêtre publiée, antérieur à as_of (as_of lui-même est rattrapé au pas suivant)
+        stale as (
+          update score_rolling_state set stale = true
+           where %(d0)s::date < as_of
+             and %(d1)s::date > as_of - window_days
+             and exists (select 1 from upserted union all select 1 from deleted)
+          returning 1
+        )
+        select (select count(*) from upserted), (select count(*) from deleted),
+               (select count(*) from stale);
+        """,
+        {"d0": date_from, "d1": date_to},
+    )
+    upserted, deleted, _ = cur.fetchone()
+    return int(upserted), int(deleted)
 
 
 def recompute_daily(score_date=None) -> int:
@@ -14,51 +94,207 @@ def recompute_daily(score_date=None) -> int:
     if score_date is None:
         score_date = datetime.date.today().isoformat()
 
-    with psycopg.connect(DB_URL, autocommit=True) as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            # Aggrège les poids, prend le type dominant et une explication simple
+            upserted, _ = _recompute_range(cur, score_date, score_date)
+    response_cache.invalidate(f"scores:{score_date}")
+    return upserted
+
+
+def _date_chunks(date_from: datetime.date, date_to: datetime.date, chunk_days: int):
+    start = date_from
+    while start <= date_to:
+        end = min(start + datetime.timedelta(days=chunk_days - 1), date_to)
+        yield start, end
+        start = end + datetime.timedelta(days=1)
+
+
+def _backfill_chunk(run_key: str, start: datetime.date, end: datetime.date) -> dict:
+    # Une connexion par chunk; score + checkpoint dans la même transaction
+    t0 = time.perf_counter()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            upserted, deleted = _recompute_range(cur, start, end)
+            elapsed = time.perf_counter() - t0
             cur.execute(
                 """
-                with day_signals as (
-                  select
-                    s.company_id,
-                    s.type,
-                    sum(s.weight) as weight_sum,
-                    count(*) as cnt
-                  from signal s
-                  where s.event_date = %s
-                  group by 1,2
-                ),
-                per_company as (
-                  select
-                    company_id,
-                    sum(weight_sum) as score_total,
-                    -- type dominant = plus gros poids cumulé, tie-break par cnt
-                    (array_agg(type order by weight_sum desc, cnt desc))[1] as top_type
-                  from day_signals
-                  group by company_id
-                )
-                insert into company_score_daily(
-                    company_id,
-                    score_date,
-                    score_total,
-                    top_signal_type,
-                    explanation
-                )
-                select
-                  company_id,
-                  %s::date,
-                  score_total,
-                  top_type,
-                  'Somme pondérée des signaux du ' || %s::text
-                from per_company
-                on conflict (company_id, score_date) do update
-                  set score_total = excluded.score_total,
-                      top_signal_type = excluded.top_signal_type,
-                      explanation = excluded.explanation
-                returning company_id;
+                insert into score_backfill_chunk (run_key, chunk_start, chunk_end, rows_upserted, rows_deleted, seconds)
+                values (%s, %s, %s, %s, %s, %s)
+                on conflict (run_key, chunk_start) do update
+                  set chunk_end = excluded.chunk_end,
+                      rows_upserted = excluded.rows_upserted,
+                      rows_deleted = excluded.rows_deleted,
+                      seconds = excluded.seconds,
+                      done_at = now();
                 """,
-                (score_date, score_date, score_date),
+                (run_key, start, end, upserted, deleted, round(elapsed, 3)),
             )
-            # rowcount = nb lignes insérées/MAJ
-            return cur.rowcount
+    return {
+        "chunk_start": start.isoformat(),
+        "chunk_end": end.isoformat(),
+        "rows_upserted": upserted,
+        "rows_deleted": deleted,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(upserted / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def backfill(date_from, date_to, chunk_days: int = 7, parallelism: int = 4, restart: bool = False) -> dict:
+    """
+    Recalcule company_score_daily sur une plage de dates, découpée en chunks
+    traités en parallèle (une connexion du pool par worker). Chaque chunk terminé
+    est checkpointé dans score_backfill_chunk: relancer la même plage après un
+    run interrompu reprend là où il s'est arrêté (sauf restart=True). Les
+    checkpoints sont supprimés une fois tous les chunks terminés.
+    """
+    d0 = datetime.date.fromisoformat(str(date_from))
+    d1 = datetime.date.fromisoformat(str(date_to))
+    if d1 < d0:
+        raise ValueError("date_to must be >= date_from")
+    run_key = f"{d0.isoformat()}:{d1.isoformat()}:{chunk_days}"
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if restart:
+                cur.execute("delete from score_backfill_chunk where run_key = %s;", (run_key,))
+            cur.execute("select chunk_start from score_backfill_chunk where run_key = %s;", (run_key,))
+            done = {r[0] for r in cur.fetchall()}
+
+    todo = [(a, b) for a, b in _date_chunks(d0, d1, chunk_days) if a not in done]
+    # Garde une connexion du pool libre pour le reste de l'app
+    parallelism = max(1, min(parallelism, get_pool().max_size - 1))
+    t0 = time.perf_counter()
+    chunks = []
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="backfill") as pool:
+        futures = [pool.submit(_backfill_chunk, run_key, a, b) for a, b in todo]
+        for fut in as_completed(futures):
+            res = fut.result()
+            chunks.append(res)
+            print(f"[backfill] {res['chunk_start']}..{res['chunk_end']}: "
+                  f"{res['rows_upserted']} rows in {res['seconds']}s ({res['rows_per_sec']} rows/s)")
+    chunks.sort(key=lambda c: c["chunk_start"])
+    # run complet (un chunk en échec lève ci-dessus): checkpoints supprimés, relancer
+    # la même plage (ex. après un changement de poids) recalcule tout
+    with connection() as conn:
+        conn.execute("delete from score_backfill_chunk where run_key = %s;", (run_key,))
+    if chunks:
+        response_cache.invalidate("scores")
+
+    return {
+        "run_key": run_key,
+        "chunks_total": len(todo) + len(done),
+        "chunks_skipped": len(done),
+        "chunks_done": len(chunks),
+        "rows_upserted": sum(c["rows_upserted"] for c in chunks),
+        "rows_deleted": sum(c["rows_deleted"] for c in chunks),
+        "seconds": round(time.perf_counter() - t0, 3),
+        "chunks": chunks,
+    }
+
+
+def recompute_dirty(batch_size: int = 5000) -> dict:
+    """
+    Scoring incrémental: ne recalcule que les couples (société, date) marqués
+    dans score_dirty (par triggers sur signal / signal_feedback), toutes dates
+    confondues. Supprime les scores dont la société n'a plus de signal ce jour-là.
+    Traite la file par lots (une transaction par lot, skip locked => runs concurrents sûrs).
+    """
+    claimed = upserted = deleted = 0
+    while True:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    with batch as (
+                      select company_id, event_date
+                        from score_dirty
+                       order by marked_at
+                       limit %s
+                         for update skip locked
+                    ),
+                    claimed as (
+                      delete from score_dirty d
+                       using batch b
+                       where d.company_id = b.company_id and d.event_date = b.event_date
+                      returning d.company_id, d.event_date
+                    ),
+                    day_signals as (
+                      select s.company_id, s.event_date, s.type,
+                             sum(s.weight) as weight_sum, count(*) as cnt
+                        from signal s
+                        join claimed c on c.company_id = s.company_id and c.event_date = s.event_date
+                       where s.dup_of is null
+                       group by 1, 2, 3
+                    ),
+                    per_company as (
+                      select company_id, event_date,
+                             sum(weight_sum) as score_total,
+                             (array_agg(type order by weight_sum desc, cnt desc))[1] as top_type
+                        from day_signals
+                       group by 1, 2
+                    ),
+                    upserted as (
+                      insert into company_score_daily(
+                          company_id, score_date, score_total, top_signal_type, explanation
+                      )
+                      select company_id, event_date, score_total, top_type,
+                             'Somme pondérée des signaux du ' || event_date::text
+                        from per_company
+                      on conflict (company_id, score_date) do update
+                        set score_total = excluded.score_total,
+                            top_signal_type = excluded.top_signal_type,
+                            explanation = excluded.explanation
+                      returning company_id
+                    ),
+                    deleted as (
+                      delete from company_score_daily cs
+                       using claimed c
+                       where cs.company_id = c.company_id and cs.score_date = c.event_date
+                         and not exists (
+                           select 1 from per_company p
+                            where p.company_id = c.company_id and p.event_date = c.event_date
+                         )
+                      returning cs.company_id
+                    ),
+                    -- fenêtre glissante stale seulement si un jour rescoré est antérieur au
+                    -- dernier jour publié (et encore dans la fenêtre); as_of lui-même est
+                    -- rattrapé par le pas incrémental suivant
+                    stale as (
+                      update score_rolling_state st set stale = true
+                       where exists (select 1 from claimed c
+                                      where c.event_date < st.as_of
+                                        and c.event_date > st.as_of - st.window_days)
+                      returning 1
+                    )
+                    select (select count(*) from claimed),
+                           (select count(*) from upserted),
+                           (select count(*) from deleted),
+                           (select count(*) from stale);
+                    """,
+                    (batch_size,),
+                )
+                n_claimed, n_upserted, n_deleted, _ = (int(v) for v in cur.fetchone())
+        claimed += n_claimed
+        upserted += n_upserted
+        deleted += n_deleted
+        if n_claimed < batch_size:
+            break
+    if claimed:
+        response_cache.invalidate("scores")
+    return {"dirty_processed": claimed, "upserted": upserted, "deleted": deleted}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Backfill de company_score_daily sur une plage de dates")
+    parser.add_argument("date_from")
+    parser.add_argument("date_to")
+    parser.add_argument("--chunk-days", type=int, default=7)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--restart", action="store_true", help="ignore les checkpoints existants")
+    args = parser.parse_args()
+    res = backfill(args.date_from, args.date_to, args.chunk_days, args.parallelism, args.restart)
+    res.pop("chunks")
+    print(json.dumps(res, indent=2))
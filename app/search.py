@@ -0,0 +1,50 @@
+"""
+Recherche plein texte sur les signaux (tsvector français + GIN) et recherche
+par trigrammes sur les sociétés (nom, SIREN partiel), cf. models.sql.
+"""
+
+SEARCH_CONFIG = "french"
+# Pondération de la fraîcheur dans le tri "relevance": rang / (1 + âge / RECENCY_DAYS)
+RECENCY_DAYS = 30
+
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def signal_match(q: str, include_company: bool = False) -> tuple[str, list]:
+    """
+    Condition SQL (alias s = signal) + paramètres pour une recherche texte.
+    include_company: matche aussi le nom de société et le SIREN partiel. Les
+    deux critères sont deux branches d'une UNION, chacune servie par son index
+    (GIN search_tsv, puis idx_signal_company_date sur les sociétés résolues par
+    les trigrammes): un OR entre le tsvector et un IN (sous-requête) forcerait
+    un parcours séquentiel de signal.
+    """
+    q = q.strip()
+    tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+    if not include_company:
+        return f"s.search_tsv @@ {tsquery}", [q]
+    v = f"%{_like_escape(q)}%"
+    sql = (
+        "s.id in ("
+        f"select id from signal where search_tsv @@ {tsquery}"
+        " union "
+        "select id from signal where company_id = any(array("
+        "select id from company where name ilike %s or siren like %s)))"
+    )
+    return sql, [q, v, v]
+
+
+def signal_rank(q: str) -> tuple[str, list]:
+    """Expression de tri: pertinence ts_rank_cd pondérée par la fraîcheur de l'événement."""
+    sql = (
+        f"ts_rank_cd(s.search_tsv, websearch_to_tsquery('{SEARCH_CONFIG}', %s), 32)"
+        f" / (1 + greatest(current_date - s.event_date, 0) / {RECENCY_DAYS}.0)"
+    )
+    return sql, [q.strip()]
+
+
+def document_match(q: str) -> tuple[str, list]:
+    """Condition SQL (alias d = document_pdf) sur le titre des documents."""
+    return f"d.search_tsv @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)", [q.strip()]
@@ -0,0 +1,169 @@
+"""
+Lecture en flux des exports open data BODACC (annonces commerciales).
+
+Formats: JSON (tableau ou une annonce par ligne), CSV (séparateur ; ou ,),
+XML (une annonce par élément <annonce>), éventuellement compressés (.gz).
+iter_records() ne garde jamais le fichier entier en mémoire; normalize()
+convertit une annonce brute au format d'ingestion {text, url, event_date}
+(+ company_name quand l'export le fournit).
+"""
+import csv
+import gzip
+import io
+import json
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Iterator
+from xml.etree.ElementTree import iterparse
+
+DETAIL_URL = "https://www.bodacc.fr/pages/annonces-commerciales-detail/?q.id=id:{}"
+XML_RECORD_TAG = "annonce"
+_READ_SIZE = 1 << 16
+_SIREN_IN_REGISTRE = re.compile(r"\d{3}\s?\d{3}\s?\d{3}")
+
+# Champs de l'export opendatasoft assemblés (dans cet ordre) en texte d'annonce
+_TEXT_FIELDS = ("familleavis_lib", "typeavis_lib", "commercant", "ville", "tribunal")
+# Champs contenant du JSON sérialisé dans l'export (jugement, acte, ...)
+_JSON_FIELDS = ("jugement", "acte", "modificationsgenerales", "depot", "radiationaurcs")
+# Métadonnées jamais reprises dans le texte (identifiants, dates: faux SIREN possibles)
+_META_FIELDS = {"id", "numeroannonce", "dateparution", "date_parution", "event_date", "registre",
+                "url_complete", "url", "parution", "numerodepartement", "cp"}
+
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _base_suffix(path: Path) -> str:
+    suffixes = [s for s in path.suffixes if s != ".gz"]
+    return suffixes[-1].lower() if suffixes else ""
+
+
+def _iter_json_array(f, buf: str) -> Iterator[dict]:
+    # Découpe incrémentale d'un tableau JSON: raw_decode objet par objet
+    dec = json.JSONDecoder()
+    pos = buf.index("[") + 1
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                obj, pos = dec.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # objet incomplet: lire la suite
+            yield obj
+        chunk = f.read(_READ_SIZE)
+        if not chunk:
+            raise ValueError("JSON tronqué")
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def _iter_json(f) -> Iterator[dict]:
+    head = f.read(_READ_SIZE)
+    if head.lstrip().startswith("["):
+        yield from _iter_json_array(f, head)
+        return
+    # JSON lines: la dernière ligne du premier bloc est complétée par readline()
+    lines = head.split("\n")
+    lines[-1] += f.readline()
+    for line in chain(lines, f):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_csv(f) -> Iterator[dict]:
+    head = f.readline()
+    delimiter = ";" if head.count(";") >= head.count(",") else ","
+    yield from csv.DictReader(chain([head], f), delimiter=delimiter)
+
+
+def _iter_xml(path: Path, tag: str) -> Iterator[dict]:
+    src = gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+    with src:
+        for _, elem in iterparse(src, events=("end",)):
+            if elem.tag.rsplit("}", 1)[-1] != tag:
+                continue
+            rec, body = {}, []
+            for child in elem.iter():
+                name = child.tag.rsplit("}", 1)[-1].lower()
+                if child is not elem and child.text and child.text.strip():
+                    rec.setdefault(name, child.text.strip())
+                    if name not in _META_FIELDS and name not in _TEXT_FIELDS:
+                        body.append(child.text.strip())
+            # feuilles imbriquées (jugement/nature, acte/vente/...): texte libre de l'annonce
+            rec["_text"] = ". ".join(body)
+            elem.clear()  # mémoire constante: l'arbre déjà lu est vidé
+            yield rec
+
+
+def iter_records(path: str | Path, xml_tag: str = XML_RECORD_TAG) -> Iterator[dict]:
+    """Annonces brutes du fichier, une par une, dans l'ordre du fichier."""
+    path = Path(path)
+    kind = _base_suffix(path)
+    if kind == ".xml":
+        yield from _iter_xml(path, xml_tag)
+        return
+    with _open_text(path) as f:
+        if kind == ".csv":
+            yield from _iter_csv(f)
+        elif kind in (".json", ".jsonl", ".ndjson"):
+            yield from _iter_json(f)
+        else:
+            raise ValueError(f"format non supporté: {path.name}")
+
+
+def _field(rec: dict, *names):
+    for n in names:
+        v = rec.get(n)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def _json_text(value) -> str | None:
+    # jugement / acte...: JSON sérialisé (CSV) ou objet (JSON); on garde les valeurs texte
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, (dict, list)):
+        values = value.values() if isinstance(value, dict) else value
+        return " ".join(filter(None, (_json_text(v) for v in values)))
+    return str(value) if value is not None else None
+
+
+def normalize(rec: dict) -> dict:
+    """
+    Annonce brute -> {text, url, event_date}. Accepte le format d'ingestion
+    (text/url/event_date) tel quel, sinon les champs de l'export opendatasoft
+    (dateparution, registre, commercant, jugement, url_complete, ...).
+    Une annonce inexploitable renvoie des champs vides (comptée "skipped").
+    """
+    if rec.get("text") and rec.get("url"):
+        return {"text": rec["text"], "url": rec["url"], "event_date": rec.get("event_date")}
+
+    rid = _field(rec, "id", "numeroannonce")
+    url = _field(rec, "url_complete", "url") or (DETAIL_URL.format(rid) if rid else None)
+    event_date = _field(rec, "dateparution", "date_parution", "event_date")
+    if isinstance(event_date, str):
+        event_date = event_date[:10]
+
+    parts = [str(rec[f]) for f in _TEXT_FIELDS if rec.get(f)]
+    registre = rec.get("registre")
+    if isinstance(registre, list):
+        registre = ",".join(map(str, registre))
+    m = _SIREN_IN_REGISTRE.search(registre or "")
+    if m:
+        parts.append("SIREN " + re.sub(r"\s", "", m.group(0)))
+    parts += filter(None, (_json_text(rec.get(f)) for f in _JSON_FIELDS))
+    if rec.get("_text"):
+        parts.append(rec["_text"])
+    return {"text": ". ".join(parts), "url": url, "event_date": event_date,
+            "company_name": rec.get("commercant")}
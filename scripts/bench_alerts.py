@@ -0,0 +1,109 @@
+"""
+Benchmark du rapprochement des alertes clients (app/alerts.py): durée d'un
+passage complet selon le nombre de clients, à volume de scores constant.
+
+    DB_URL=... python scripts/bench_alerts.py [--companies 30000] [--clients 10,100,500,1000]
+
+Insère des sociétés synthétiques (nom 'BENCH ALERTS ...', NAF aléatoire) avec
+un score à la date du jour, puis des clients 'bench-alerts' (seuil et 1 à 3
+préfixes NAF aléatoires, un sur cinq sans filtre sectoriel). Pour chaque palier,
+mesure le premier passage (création des alertes) et un second passage
+(idempotent: aucune écriture attendue). Tout est supprimé en fin de run.
+"""
+import argparse
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import psycopg  # noqa: E402
+
+from app.db import DB_URL  # noqa: E402
+from app.alerts import match_alerts  # noqa: E402
+from app.partitions import ensure_months_for_dates  # noqa: E402
+
+BENCH_COMPANY = "BENCH ALERTS "
+BENCH_CLIENT = "bench-alerts "
+NAF_CODES = ["10.71C", "25.62B", "41.20A", "43.21A", "46.69B", "47.11F", "49.41A", "56.10A",
+             "62.01Z", "62.02A", "68.20B", "70.22Z", "71.12B", "82.99Z", "86.21Z", "96.02A"]
+
+
+def seed_companies(conn, n: int, day: datetime.date):
+    rnd = random.Random(7)
+    with conn.cursor() as cur:
+        ensure_months_for_dates(cur, [day])
+        with cur.copy("copy company (name, naf) from stdin") as cp:
+            for i in range(n):
+                cp.write_row((f"{BENCH_COMPANY}{i}", rnd.choice(NAF_CODES)))
+        cur.execute("""
+            insert into company_score_daily (company_id, score_date, score_total, top_signal_type, explanation)
+            select id, %s, (abs(hashtext(name)) %% 120)::numeric, 'PROC_COLLECTIVE', 'bench'
+              from company where name like %s;
+        """, (day, BENCH_COMPANY + "%"))
+    conn.commit()
+
+
+def add_clients(conn, start: int, stop: int):
+    rnd = random.Random(start)
+    with conn.cursor() as cur:
+        for i in range(start, stop):
+            cur.execute("""
+                insert into client (name, email_primary, alert_threshold, is_active)
+                values (%s, %s, %s, true) returning id;
+            """, (f"{BENCH_CLIENT}{i}", f"bench{i}@example.invalid", rnd.choice([60, 75, 90])))
+            cid = cur.fetchone()[0]
+            if i % 5 == 0:
+                continue  # tous secteurs
+            prefixes = {rnd.choice(NAF_CODES)[:rnd.choice([2, 5])] for _ in range(rnd.randint(1, 3))}
+            cur.executemany("insert into client_sector (client_id, naf_prefix) values (%s, %s);",
+                            [(cid, p) for p in prefixes])
+    conn.commit()
+
+
+def cleanup(conn):
+    conn.execute("delete from client where name like %s;", (BENCH_CLIENT + "%",))
+    conn.execute("delete from company where name like %s;", (BENCH_COMPANY + "%",))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, default=30_000)
+    parser.add_argument("--clients", default="10,100,500,1000", help="paliers (cumulatifs)")
+    args = parser.parse_args()
+    tiers = sorted(int(x) for x in args.clients.split(","))
+    day = datetime.date.today()
+
+    with psycopg.connect(DB_URL) as conn:
+        cleanup(conn)
+        t0 = time.perf_counter()
+        seed_companies(conn, args.companies, day)
+        conn.execute("analyze company; analyze company_score_daily;")
+        conn.commit()
+        print(f"seed: {args.companies} sociétés scorées en {time.perf_counter() - t0:.1f}s\n")
+        print(f"{'clients':>8} {'alertes':>9} {'1er passage (s)':>16} {'ms/client':>10} {'2e passage (s)':>15} {'écritures':>10}")
+        try:
+            done = 0
+            for n in tiers:
+                add_clients(conn, done, n)
+                done = n
+                conn.execute("analyze client; analyze client_sector;")
+                conn.commit()
+                t1 = time.perf_counter()
+                match_alerts(day, lookback_days=0)
+                t2 = time.perf_counter()
+                second = match_alerts(day, lookback_days=0)
+                t3 = time.perf_counter()
+                total = conn.execute("select count(*) from client_alert where score_date = %s;", (day,)).fetchone()[0]
+                print(f"{n:>8} {total:>9} {t2 - t1:>16.3f} {(t2 - t1) * 1000 / n:>10.2f} {t3 - t2:>15.3f} "
+                      f"{second['alerts_created'] + second['alerts_updated']:>10}")
+        finally:
+            cleanup(conn)
+            print("\ncleanup: clients et sociétés de bench supprimés")
+
+
+if __name__ == "__main__":
+    main()
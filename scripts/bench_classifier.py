@@ -0,0 +1,120 @@
+"""
+Micro-benchmark du classifieur de signaux.
+
+    python scripts/bench_classifier.py [N]
+
+Mesure le débit de app/classifier.py (unitaire et par lots) sur N extraits
+synthétiques (défaut 1M), face à l'ancienne chaîne if/elif et à une regex
+unique combinant tous les motifs. Rejoué avec une table étendue (~35 motifs)
+pour voir l'évolution quand on ajoute des règles.
+"""
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.classifier import Classifier, Rule, get_classifier  # noqa: E402
+
+FRAGMENTS = [
+    "Ouverture d’une procédure de redressement judiciaire pour",
+    "Liquidation judiciaire simplifiée:",
+    "Cession de fonds de commerce:",
+    "Projet de fusion:",
+    "Augmentation de capital pour",
+    "Transfert de siège social:",
+    "Modification du capital social de",
+    "Dépôt des comptes annuels de",
+]
+EXTRA_PATTERNS = [
+    "apport partiel d'actifs", "location-gérance", "dissolution anticipée", "plan de sauvegarde",
+    "conciliation", "mandat ad hoc", "augmentation de capital", "réduction de capital",
+    "transfert de siège", "changement de dirigeant", "nomination du commissaire", "vente de fonds",
+    "cession de parts", "cession d'actions", "scission", "absorption", "transmission universelle",
+    "radiation", "mise en sommeil", "reprise d'activité", "plan de continuation", "plan de cession",
+    "liquidation amiable", "jugement d'ouverture", "clôture pour insuffisance d'actif",
+    "modification de l'objet social", "changement de dénomination", "prorogation", "démission",
+]
+NAMES = ["SOCIETE DURAND SAS", "BOULANGERIE MARTIN", "TECHNOVA SA", "LOGI-TRANS", "ATELIER BOIS"]
+
+
+def legacy_classify(text: str):
+    # Copie de l'ancienne chaîne de collector_bodacc_ingest
+    txt = text.lower()
+    if "redressement judiciaire" in txt or "liquidation judiciaire" in txt:
+        return "PROC_COLLECTIVE", 100, 0.95
+    elif "cession de fonds" in txt:
+        return "SALE_OF_BUSINESS", 70, 0.80
+    elif "fusion" in txt:
+        return "M&A_PROJECT", 60, 0.70
+    return "OTHER", 30, 0.50
+
+
+def make_regex(clf: Classifier):
+    # Variante "une seule regex": tous les motifs en alternance, meilleure priorité retenue
+    rank = {}
+    for i, r in enumerate(clf.rules):
+        for p in r.patterns:
+            rank.setdefault(p.lower(), i)
+    rx = re.compile("|".join(re.escape(p) for p in sorted(rank, key=len, reverse=True)))
+    results = [(r.type, r.weight, r.confidence) for r in clf.rules]
+
+    def classify(text: str):
+        best = min((rank[m.group(0)] for m in rx.finditer(text.lower())), default=None)
+        return results[best] if best is not None else clf.default
+
+    return classify
+
+
+def extended(clf: Classifier) -> Classifier:
+    extra = [Rule(f"EXTRA_{i}", 10, 0.5, 1000 + i, (p,)) for i, p in enumerate(EXTRA_PATTERNS)]
+    return Classifier(list(clf.rules) + extra, clf.default)
+
+
+def synth(n: int, seed: int = 42) -> list[str]:
+    rnd = random.Random(seed)
+    return [
+        f"{rnd.choice(FRAGMENTS)} {rnd.choice(NAMES)} (SIREN {rnd.randint(100000000, 999999999)}). "
+        f"Greffe du tribunal de commerce de {rnd.choice(['Paris', 'Lyon', 'Lille', 'Nantes'])}."
+        for _ in range(n)
+    ]
+
+
+def bench(label: str, fn, n: int):
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {dt:7.2f}s  {n / dt:>12,.0f} extraits/s")
+    return out
+
+
+def run(title: str, clf: Classifier, texts: list[str], batch: int = 10_000, legacy=None):
+    n = len(texts)
+    print(f"-- {title} ({sum(len(r.patterns) for r in clf.rules)} motifs)")
+    ref = None
+    if legacy is not None:
+        ref = bench("if/elif (ancien)", lambda: [legacy(t) for t in texts], n)
+    rx = make_regex(clf)
+    alt = bench("regex unique", lambda: [rx(t) for t in texts], n)
+    one = bench("classifier (unitaire)", lambda: [clf.classify(t) for t in texts], n)
+    bat = bench(
+        f"classifier (lots de {batch})",
+        lambda: [r for i in range(0, n, batch) for r in clf.classify_batch(texts[i:i + batch])],
+        n,
+    )
+    assert one == bat == alt and (ref is None or ref == one), "résultats divergents"
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    texts = synth(n)
+    clf = get_classifier()
+    run("règles livrées", clf, texts, legacy=legacy_classify)
+    run("règles étendues", extended(clf), texts)
+    print("OK: résultats identiques")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark de l'export en flux des signaux (app/export.py): débit et pic
+mémoire Python par format, comparés au chemin "tout en mémoire" (fetchall +
+sérialisation du lot complet).
+
+    DB_URL=... python scripts/bench_export.py [--seed N] [--cleanup] [--skip-baseline]
+
+--seed insère N signaux synthétiques (url 'bench://export/...') via COPY,
+--cleanup les supprime en fin de run. Le pic mémoire est mesuré par
+tracemalloc (allocations Python, hors buffers libpq).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import psycopg  # noqa: E402
+
+from app.db import DB_URL, open_async_pool, close_async_pool  # noqa: E402
+from app.export import stream_export, signals_query, SIGNAL_COLUMNS  # noqa: E402
+
+BENCH_URL = "bench://export/"
+TYPES = ["PROC_COLLECTIVE", "SALE_OF_BUSINESS", "M&A_PROJECT", "OTHER"]
+
+
+def seed(conn, n: int):
+    rnd = random.Random(11)
+    today = datetime.date.today()
+    with conn.cursor() as cur:
+        with cur.copy("copy signal (source, type, event_date, url, excerpt, weight, confidence) from stdin") as cp:
+            for i in range(n):
+                d = today - datetime.timedelta(days=rnd.randint(0, 1460))
+                cp.write_row(("BENCH", rnd.choice(TYPES), d, f"{BENCH_URL}{i}",
+                              f"Annonce synthétique n°{i} — jugement du tribunal de commerce", 30, 0.5))
+    conn.commit()
+
+
+async def run_stream(fmt: str, gzip: bool) -> tuple[int, float, int]:
+    sql, params = signals_query()
+    size = 0
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    async for chunk in stream_export(sql, params, SIGNAL_COLUMNS, fmt=fmt, gzip=gzip):
+        size += len(chunk)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def run_baseline() -> tuple[int, float, int]:
+    sql, params = signals_query()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with psycopg.connect(DB_URL) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    body = "".join(json.dumps(dict(zip(SIGNAL_COLUMNS, r)), ensure_ascii=False) + "\n" for r in rows).encode()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(body), elapsed, peak
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--skip-baseline", action="store_true", help="évite le chemin fetchall (gros volumes)")
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL) as conn:
+        if args.seed:
+            t0 = time.perf_counter()
+            seed(conn, args.seed)
+            print(f"seed: {args.seed} signaux en {time.perf_counter() - t0:.1f}s")
+            conn.execute("analyze signal;")
+            conn.commit()
+        total = conn.execute("select count(*) from signal;").fetchone()[0]
+    print(f"signal: {total} lignes\n")
+    print(f"{'mode':<22} {'secondes':>9} {'lignes/s':>11} {'Mo/s':>7} {'sortie (Mo)':>12} {'pic mém. (Mo)':>14}")
+
+    def report(name, size, elapsed, peak):
+        print(f"{name:<22} {elapsed:>9.2f} {total / elapsed:>11,.0f} {size / elapsed / 1e6:>7.1f} "
+              f"{size / 1e6:>12.1f} {peak / 1e6:>14.1f}")
+
+    if not args.skip_baseline:
+        report("fetchall ndjson", *run_baseline())
+
+    await open_async_pool()
+    try:
+        for fmt in ("ndjson", "csv"):
+            for gz in (False, True):
+                report(f"stream {fmt}{' gzip' if gz else ''}", *(await run_stream(fmt, gz)))
+    finally:
+        await close_async_pool()
+
+    if args.cleanup:
+        with psycopg.connect(DB_URL) as conn:
+            conn.execute("delete from signal where url like %s;", (BENCH_URL + "%",))
+        print("\ncleanup: signaux de bench supprimés")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Benchmark de la recherche sur les signaux: ancien chemin ILIKE vs plein texte
+(tsvector français + GIN) classé pertinence + fraîcheur (app/search.py), puis
+le chemin de la page /signals (plein texte + nom de société / SIREN partiel).
+
+    DB_URL=... python scripts/bench_search.py [--seed N] [--runs R] [--cleanup]
+
+--seed insère N signaux synthétiques (url 'bench://search/...') via COPY pour
+mesurer à volume réaliste; --cleanup les supprime en fin de run.
+"""
+import argparse
+import datetime
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import psycopg  # noqa: E402
+
+from app.db import DB_URL  # noqa: E402
+from app.search import SEARCH_CONFIG, signal_match, signal_rank  # noqa: E402
+from bench_classifier import synth  # noqa: E402
+
+QUERIES = ["redressement judiciaire", "fusion", "cession de fonds", "TECHNOVA", "Lyon"]
+BENCH_URL = "bench://search/"
+
+
+def seed(conn, n: int):
+    rnd = random.Random(7)
+    today = datetime.date.today()
+    with conn.cursor() as cur:
+        with cur.copy("copy signal (source, type, event_date, url, excerpt, weight, confidence) from stdin") as cp:
+            for i, text in enumerate(synth(n)):
+                d = today - datetime.timedelta(days=rnd.randint(0, 730))
+                cp.write_row(("BENCH", "OTHER", d, f"{BENCH_URL}{i}", text, 30, 0.5))
+    conn.commit()
+
+
+def timed(conn, sql: str, params: list, runs: int) -> tuple[float, int]:
+    samples, n = [], 0
+    with conn.cursor() as cur:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            cur.execute(sql, params)
+            n = len(cur.fetchall())
+            samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    with psycopg.connect(DB_URL) as conn:
+        if args.seed:
+            t0 = time.perf_counter()
+            seed(conn, args.seed)
+            print(f"seed: {args.seed} signaux en {time.perf_counter() - t0:.1f}s")
+            conn.execute("analyze signal;")
+            conn.commit()
+        total = conn.execute("select count(*) from signal;").fetchone()[0]
+        print(f"signal: {total} lignes, limit={args.limit}, médiane sur {args.runs} runs\n")
+        print(f"{'requête':<26} {'ILIKE (ms)':>12} {'FTS (ms)':>12} {'hits ILIKE/FTS':>16}")
+
+        for q in QUERIES:
+            legacy_sql = """
+                select s.id from signal s
+                 where s.excerpt ilike %s
+                 order by s.event_date desc, s.id desc
+                 limit %s
+            """
+            legacy_ms, legacy_n = timed(conn, legacy_sql, [f"%{q}%", args.limit], args.runs)
+
+            match_sql, match_params = signal_match(q)
+            rank_sql, rank_params = signal_rank(q)
+            fts_sql = f"""
+                select s.id from signal s
+                 where {match_sql}
+                 order by {rank_sql} desc, s.event_date desc, s.id desc
+                 limit %s
+            """
+            fts_ms, fts_n = timed(conn, fts_sql, match_params + rank_params + [args.limit], args.runs)
+            print(f"{q:<26} {legacy_ms:>12.1f} {fts_ms:>12.1f} {legacy_n:>8}/{fts_n:<7}")
+
+        # /signals: include_company=True, ancien OR + IN vs UNION des deux branches indexées
+        print(f"\n{'requête /signals':<26} {'OR (ms)':>12} {'UNION (ms)':>12} {'hits OR/UNION':>16}")
+        for q in QUERIES:
+            v = f"%{q}%"
+            or_sql = f"""
+                select s.id from signal s
+                 where (s.search_tsv @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)
+                        or s.company_id in (select id from company where name ilike %s or siren like %s))
+                 order by s.event_date desc, s.id desc
+                 limit %s
+            """
+            or_ms, or_n = timed(conn, or_sql, [q, v, v, args.limit], args.runs)
+
+            match_sql, match_params = signal_match(q, include_company=True)
+            union_sql = f"""
+                select s.id from signal s
+                 where {match_sql}
+                 order by s.event_date desc, s.id desc
+                 limit %s
+            """
+            union_ms, union_n = timed(conn, union_sql, match_params + [args.limit], args.runs)
+            print(f"{q:<26} {or_ms:>12.1f} {union_ms:>12.1f} {or_n:>8}/{union_n:<7}")
+
+        if args.cleanup:
+            conn.execute("delete from signal where url like %s;", (BENCH_URL + "%",))
+            conn.commit()
+            print("\ncleanup: signaux de bench supprimés")
+
+
+if __name__ == "__main__":
+    main()
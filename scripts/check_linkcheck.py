@@ -0,0 +1,106 @@
+"""
+Contrôle de app/linkcheck.py contre un serveur HTTP local (http.server), sans
+base ni réseau:
+
+    python scripts/check_linkcheck.py
+
+Routes du stub: /ok (200), /missing (404), /no-head (HEAD refusé en 405, GET
+partiel en 206), /slow (répond après le timeout). Vérifie les statuts, le
+repli GET, le timeout, une URL mal formée (le run continue) et la borne de
+concurrence par hôte. Code de sortie 1 au premier écart.
+"""
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.linkcheck import check_urls  # noqa: E402
+
+TIMEOUT = 0.5
+PER_HOST = 2
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def _serve(self, head: bool):
+        path = self.path.split("?")[0]
+        if path == "/slow":
+            # hors du décompte: le handler dort encore après le timeout côté client
+            time.sleep(TIMEOUT * 3)
+            return
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(0.05)  # requêtes qui se chevauchent: mesure de la concurrence
+            if path == "/no-head" and head:
+                status = 405
+            elif path == "/no-head":
+                status = 206 if self.headers.get("Range") == "bytes=0-0" else 200
+            elif path == "/ok" or path.startswith("/ok/"):
+                status = 200
+            else:
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client parti (timeout)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    expected = {
+        f"{base}/ok": (200, None),
+        f"{base}/missing": (404, None),
+        f"{base}/no-head": (206, None),
+        f"{base}/slow": (None, "ReadTimeout"),
+        "http://[::1": (None, "invalid url"),
+    }
+    burst = [f"{base}/ok/{i}" for i in range(12)]
+    try:
+        results = asyncio.run(check_urls(list(expected) + burst, concurrency=10,
+                                         per_host=PER_HOST, timeout=TIMEOUT))
+    finally:
+        server.shutdown()
+
+    failures = [f"{url}: {results.get(url)} (attendu {want})"
+                for url, want in expected.items() if results.get(url) != want]
+    failures += [f"{url}: {results.get(url)}" for url in burst if results.get(url) != (200, None)]
+    if StubHandler.max_active > PER_HOST:
+        failures.append(f"concurrence par hôte: {StubHandler.max_active} > {PER_HOST}")
+    for url, (st, err) in sorted(results.items()):
+        print(f"{st or '-':>4}  {url}  {err or ''}")
+    print(f"\nconcurrence max observée: {StubHandler.max_active} (borne {PER_HOST})")
+    if failures:
+        print("\nÉCARTS:\n" + "\n".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
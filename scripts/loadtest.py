@@ -0,0 +1,95 @@
+"""
+Test de charge: capacité en requêtes concurrentes d'un endpoint, et latence de
+/healthz pendant la charge (détecte la famine du threadpool).
+
+    python scripts/loadtest.py http://localhost:8080 [--path /api/signals?limit=50]
+                               [--concurrency 10,50,100,200] [--duration 10]
+
+À lancer sur la version avant/après (ex. deux tags d'image) pour comparer.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def pct(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run_level(base: str, path: str, concurrency: int, duration: float, headers: dict, bust: bool) -> dict:
+    lat: list[float] = []
+    health: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=base, timeout=30, limits=limits, headers=headers) as client:
+        sep = "&" if "?" in path else "?"
+        seq = iter(range(10**9))
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                # paramètre unique par requête: contourne le cache serveur, mesure le chemin DB
+                url = f"{path}{sep}_lt={next(seq)}" if bust else path
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(url)
+                    if r.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                lat.append((time.perf_counter() - t0) * 1000)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    await client.get("/healthz")
+                except httpx.HTTPError:
+                    pass
+                health.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.2)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(probe(), *(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(lat),
+        "rps": len(lat) / elapsed,
+        "p50": statistics.median(lat) if lat else float("nan"),
+        "p95": pct(lat, 0.95),
+        "errors": errors,
+        "healthz_p95": pct(health, 0.95),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("--path", default="/api/signals?limit=50&total=none")
+    parser.add_argument("--concurrency", default="10,50,100,200")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--use-cache", action="store_true", help="ne pas contourner le cache serveur")
+    parser.add_argument("--bearer", default=None, help="jeton pour les endpoints authentifiés (/me)")
+    args = parser.parse_args()
+    headers = {"Authorization": f"Bearer {args.bearer}"} if args.bearer else {}
+
+    print(f"{args.base}{args.path}, {args.duration:.0f}s par palier")
+    print(f"{'conc.':>6} {'req':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'err':>6} {'healthz p95':>12}")
+    for c in (int(x) for x in args.concurrency.split(",")):
+        r = await run_level(args.base, args.path, c, args.duration, headers, not args.use_cache)
+        print(f"{r['concurrency']:>6} {r['requests']:>8} {r['rps']:>9.1f} {r['p50']:>9.1f} "
+              f"{r['p95']:>9.1f} {r['errors']:>6} {r['healthz_p95']:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())